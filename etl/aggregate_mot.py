@@ -2,31 +2,119 @@
 """
 Compute model/year aggregates used by the frontend:
 - pass_rate_by_age
-- mileage percentiles by age (p50/p75/p90)
+- mileage percentiles by age (p50/p75/p90), exact or from mergeable histogram sketches
 - failure category shares (if failures parquet present)
 
 Works with 2024+ DVSA layout (ingested by ingest_results.py):
 required columns present in Parquet dataset:
-  make, model, test_date (datetime64[ns, UTC]), odometer (Int64),
-  result ('P'/'F'), fuel_type (string), age_at_test (Int64, optional),
+  make, model, test_date (datetime64[ns, UTC]), odometer (Int32),
+  result ('P'/'F'), fuel_type, age_at_test (Int16, optional),
   first_use_date (datetime64[ns, UTC], optional)
+make/model/result/fuel_type are dictionary-encoded and read as categoricals, so every
+groupby over them passes observed=True.
+
+Only the columns a metric needs are read, and the join_publish env filters
+(ETL_MAKE_FILTER, ETL_MODEL_FILTER, ETL_YEAR_MIN, ETL_YEAR_MAX) plus
+ETL_TEST_CLASS / ETL_TEST_TYPE (comma lists) are pushed down into the
+pyarrow.dataset scan. A make/model/year-filtered run splices its cohorts
+into the existing mot_agg.parquet instead of replacing it.
 """
 
 from __future__ import annotations
 from pathlib import Path
 import json
+import os
+import shutil
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.dataset as ds
 
-from .paths import INT, MOT_PARQUET, MOT_AGG_PARQUET
+from .paths import INT, MOT_PARQUET, MOT_AGG_PARQUET, MOT_AGG_DIRTY_PARQUET
+from .resolver import norm as _norm, norm_series
+from .manifest import FULL_REBUILD, load_manifest, save_manifest, stale_sources
+
+# Optional sketch mode for mileage percentiles (ETL_MILEAGE_SKETCH=1). Each test_year=
+# partition is reduced in memory to a fixed-width odometer histogram per cohort/age and the
+# histograms are merged by summing counts, so no partition's odometer column is held at once.
+# Every estimated percentile is within ETL_MILEAGE_BIN_MILES of the exact np.nanpercentile
+# value (strictly less than one bin). State kept across runs is incremental mode's job.
+MILEAGE_SKETCH = os.environ.get("ETL_MILEAGE_SKETCH", "") not in ("", "0")
+MILEAGE_BIN_MILES = int(os.environ.get("ETL_MILEAGE_BIN_MILES", "250") or 250)
+
+# Incremental mode (ETL_AGG_INCREMENTAL=1): keep per-partition partial state (test/pass counts
+# and a mileage sketch per group) under AGG_STATE_DIR, recompute it only for test_year=
+# partitions whose files changed, and re-merge only the groups those partitions touch.
+# Percentiles in this mode come from the sketches (see the error bound above).
+AGG_INCREMENTAL = os.environ.get("ETL_AGG_INCREMENTAL", "") not in ("", "0")
+AGG_STATE_DIR = INT / "agg_state"
+AGE_KEYS = ["make","model","firstRegYear","age_at_test"]
+
+# Columns each metric needs; anything else in the dataset stays on disk.
+COHORT_COLUMNS = ("make","model","test_date","age_at_test","first_use_date")
+PASS_RATE_COLUMNS = COHORT_COLUMNS + ("result",)
+MILEAGE_COLUMNS = COHORT_COLUMNS + ("odometer",)
+
+def _env_filters() -> dict:
+    """Same env filters join_publish understands, plus test class/type lists."""
+    y_min = os.environ.get("ETL_YEAR_MIN")
+    y_max = os.environ.get("ETL_YEAR_MAX")
+    def _list(name: str) -> list[str]:
+        return [v.strip() for v in os.environ.get(name, "").split(",") if v.strip()]
+    return {
+        "make": os.environ.get("ETL_MAKE_FILTER") or None,
+        "model": os.environ.get("ETL_MODEL_FILTER") or None,
+        "y_min": int(y_min) if y_min else None,
+        "y_max": int(y_max) if y_max else None,
+        "test_class_id": _list("ETL_TEST_CLASS"),
+        "test_type": _list("ETL_TEST_TYPE"),
+    }
+
+def _cohort_filtered(f: dict | None) -> bool:
+    return bool(f) and any(f[k] is not None for k in ("make","model","y_min","y_max"))
+
+def _and(terms: list):
+    expr = None
+    for t in terms:
+        expr = t if expr is None else expr & t
+    return expr
 
-def _read_results() -> pd.DataFrame:
-    dataset = ds.dataset(MOT_PARQUET, format="parquet", partitioning="hive")
-    tbl = dataset.to_table()  # select all; columns are modest after ingest
-    df = tbl.to_pandas()
+def _results_filter(dataset: ds.Dataset, f: dict) -> ds.Expression | None:
+    """Translate env filters into a pyarrow.dataset expression (partition + row pushdown)."""
+    names = set(dataset.schema.names)
+    terms = []
+    # firstRegYear <= test_year always holds, so a cohort-year floor prunes test_year= partitions.
+    if f["y_min"] is not None and "test_year" in names:
+        terms.append(ds.field("test_year") >= f["y_min"])
+    for col in ("test_class_id", "test_type"):
+        if f[col] and col in names:
+            terms.append(ds.field(col).isin(f[col]))
+    # Make/model filters are given in normalised form; resolve them to the raw spellings present.
+    for col in ("make", "model"):
+        want = f[col]
+        if not want or col not in names:
+            continue
+        seen = dataset.to_table(columns=[col], filter=_and(terms)).column(col)
+        raw = [v for v in pc.unique(seen).to_pylist() if v is not None and _norm(v) == _norm(want)]
+        if not raw:
+            # Nothing normalises to the filter; isin([]) would not even type-check
+            return ds.scalar(False)
+        terms.append(ds.field(col).isin(raw))
+    return _and(terms)
+
+# Keep the narrow integer columns narrow (and nullable) in pandas
+_NULLABLE_INTS = {pa.int16(): pd.Int16Dtype(), pa.int32(): pd.Int32Dtype(), pa.int64(): pd.Int64Dtype()}
+
+def _read_results(path: Path | None = None, columns: tuple[str, ...] | None = None, filters: dict | None = None) -> pd.DataFrame:
+    dataset = ds.dataset(path or MOT_PARQUET, format="parquet", partitioning="hive")
+    names = dataset.schema.names
+    cols = None if columns is None else [c for c in columns if c in names]
+    expr = _results_filter(dataset, filters) if filters else None
+    df = dataset.to_table(columns=cols, filter=expr).to_pandas(types_mapper=_NULLABLE_INTS.get)
     # Ensure expected columns exist
-    for c in ("make","model","test_date","odometer","result","fuel_type"):
+    required = ("make","model","test_date","odometer","result","fuel_type")
+    for c in required if columns is None else [c for c in required if c in columns]:
         if c not in df.columns:
             raise KeyError(f"Missing required column '{c}' in results Parquet")
     if "age_at_test" not in df.columns:
@@ -46,15 +134,127 @@ def _cohort_first_reg_year(df: pd.DataFrame) -> pd.Series:
     out = out.where(out.notna(), test_year)  # last fallback
     return out.astype("Int64")
 
-def _percentiles(x: pd.Series) -> tuple[float,float,float]:
-    arr = pd.to_numeric(x, errors="coerce").dropna().to_numpy()
-    if arr.size == 0:
-        return (np.nan, np.nan, np.nan)
-    return (
-        float(np.nanpercentile(arr, 50)),
-        float(np.nanpercentile(arr, 75)),
-        float(np.nanpercentile(arr, 90)),
-    )
+def _grouped_percentiles(df: pd.DataFrame, keys: list[str], col: str, qs=(50, 75, 90)) -> pd.DataFrame:
+    """Per-group percentiles of `col`, identical to np.nanpercentile (linear) per group.
+
+    One global sort by (group, value); each group is then a contiguous run of the
+    sorted array and every percentile is a gather at start + q*(n-1) plus the same
+    lerp numpy uses. Groups with no numeric values get NaN.
+    """
+    g = df.groupby(keys, dropna=False, sort=True, observed=True)
+    out = g.size().index.to_frame(index=False)
+    if not len(out):
+        for q in qs:
+            out[f"p{q}"] = pd.Series(dtype="float64")
+        return out
+
+    gid = g.ngroup().to_numpy()
+    vals = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    ok = ~np.isnan(vals)
+    gid, vals = gid[ok], vals[ok]
+    order = np.lexsort((vals, gid))
+    gid, vals = gid[order], vals[order]
+
+    n = np.bincount(gid, minlength=len(out))
+    start = np.cumsum(n) - n
+    has = n > 0
+    n_has, start_has = n[has], start[has]
+    for q in qs:
+        pos = (n_has - 1) * (q / 100)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, n_has - 1)
+        t = pos - lo
+        a = vals[start_has + lo]
+        b = vals[start_has + hi]
+        diff = b - a
+        res = a + diff * t
+        np.subtract(b, diff * (1 - t), out=res, where=t >= 0.5)  # numpy's _lerp
+        col_out = np.full(len(out), np.nan)
+        col_out[has] = res
+        out[f"p{q}"] = col_out
+    return out
+
+def mileage_sketch(df: pd.DataFrame, keys: list[str], col: str = "odometer", bin_miles: int = MILEAGE_BIN_MILES) -> pd.DataFrame:
+    """Sparse fixed-width histogram of `col` per group: keys + bin + count."""
+    vals = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    ok = ~np.isnan(vals)
+    sk = df.loc[ok, keys].copy()
+    sk["bin"] = np.floor(vals[ok] / bin_miles).astype(np.int64)
+    return sk.groupby(keys + ["bin"], dropna=False, observed=True).size().rename("count").reset_index()
+
+def merge_sketches(sketches: list[pd.DataFrame], keys: list[str]) -> pd.DataFrame:
+    """Merge histograms from any number of partitions/batches (order-independent)."""
+    sketches = [s for s in sketches if s is not None and len(s)]
+    if not sketches:
+        return pd.DataFrame(columns=keys + ["bin", "count"])
+    return pd.concat(sketches, ignore_index=True).groupby(keys + ["bin"], dropna=False, observed=True)["count"].sum().reset_index()
+
+def sketch_percentiles(sketch: pd.DataFrame, keys: list[str], qs=(50, 75, 90), bin_miles: int = MILEAGE_BIN_MILES) -> pd.DataFrame:
+    """Approximate per-group percentiles from a merged histogram.
+
+    The k-th order statistic is placed at (k - before + 0.5)/count of the way through its
+    bin, then adjacent ranks are interpolated exactly as np.percentile does. Both ranks sit
+    strictly inside the bins holding the true values, so |error| < bin_miles.
+    """
+    sk = sketch.sort_values(keys + ["bin"], kind="stable").reset_index(drop=True)
+    g = sk.groupby(keys, dropna=False, sort=False, observed=True)
+    out = g.size().index.to_frame(index=False)
+    gid = g.ngroup().to_numpy()
+    counts = sk["count"].to_numpy(dtype=np.int64)
+    bins = sk["bin"].to_numpy(dtype=np.int64)
+    cum = np.cumsum(counts)
+    n = np.bincount(gid, weights=counts, minlength=len(out)).astype(np.int64)
+    base = np.cumsum(n) - n
+
+    def at_rank(k: np.ndarray) -> np.ndarray:
+        idx = np.searchsorted(cum, base + k, side="right")
+        before = cum[idx] - counts[idx] - base
+        return (bins[idx] + (k - before + 0.5) / counts[idx]) * bin_miles
+
+    for q in qs:
+        pos = (n - 1) * (q / 100)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, n - 1)
+        t = pos - lo
+        a, b = at_rank(lo), at_rank(hi)
+        out[f"p{q}"] = a + (b - a) * t
+    return out
+
+def _age_frame(df: pd.DataFrame, filters: dict | None = None) -> pd.DataFrame:
+    """Rows with a known age, with the cohort year (firstRegYear) attached."""
+    df["firstRegYear"] = _cohort_first_reg_year(df)
+    # If age_at_test is NA, we can still contribute to cohort size but not to curves.
+    keep = df["age_at_test"].notna()
+    if filters and filters["y_min"] is not None:
+        keep &= df["firstRegYear"] >= filters["y_min"]
+    if filters and filters["y_max"] is not None:
+        keep &= df["firstRegYear"] <= filters["y_max"]
+    return df[keep.fillna(False)]
+
+def _cohort_mask(agg: pd.DataFrame, f: dict) -> pd.Series:
+    """Aggregate rows that fall inside a make/model/year-filtered rebuild."""
+    m = pd.Series(True, index=agg.index)
+    if f["make"]:
+        m &= norm_series(agg["make"]) == _norm(f["make"])
+    if f["model"]:
+        m &= norm_series(agg["model"]) == _norm(f["model"])
+    if f["y_min"] is not None:
+        m &= agg["firstRegYear"] >= f["y_min"]
+    if f["y_max"] is not None:
+        m &= agg["firstRegYear"] <= f["y_max"]
+    return m.fillna(False).astype(bool)
+
+def build_mileage_sketches(bin_miles: int = MILEAGE_BIN_MILES, filters: dict | None = None) -> list[pd.DataFrame]:
+    """One sketch per test_year= partition, read with only the mileage columns."""
+    keys = ["make","model","firstRegYear","age_at_test"]
+    sketches = []
+    for part in sorted(Path(MOT_PARQUET).glob("test_year=*")):
+        if filters and filters["y_min"] is not None and int(part.name.split("=", 1)[1]) < filters["y_min"]:
+            continue
+        df_age = _age_frame(_read_results(part, MILEAGE_COLUMNS, filters), filters)
+        sketches.append(mileage_sketch(df_age, keys, bin_miles=bin_miles))
+    print(f"[aggregate_mot] built {len(sketches)} mileage sketches (bin={bin_miles} miles)")
+    return sketches
 
 def _compute_failure_shares() -> pd.DataFrame | None:
     """Optional: read failures parquet if present.
@@ -70,42 +270,36 @@ def _compute_failure_shares() -> pd.DataFrame | None:
     if not needed.issubset(df.columns):
         return None
     # shares per cohort (make,model,firstRegYear)
-    grp = df.groupby(["make","model","firstRegYear","category"], dropna=False)["count"].sum().reset_index()
-    totals = grp.groupby(["make","model","firstRegYear"], dropna=False)["count"].sum().rename("total")
+    grp = df.groupby(["make","model","firstRegYear","category"], dropna=False, observed=True)["count"].sum().reset_index()
+    totals = grp.groupby(["make","model","firstRegYear"], dropna=False, observed=True)["count"].sum().rename("total")
     out = grp.merge(totals, left_on=["make","model","firstRegYear"], right_index=True)
     out["share"] = out["count"] / out["total"]
     return out[["make","model","firstRegYear","category","share"]]
 
-def compute_aggregates() -> pd.DataFrame:
-    df = _read_results().copy()
+def compute_aggregates(sketch: bool = MILEAGE_SKETCH, filters: dict | None = None) -> pd.DataFrame:
+    filters = _env_filters() if filters is None else filters
+    columns = PASS_RATE_COLUMNS if sketch else PASS_RATE_COLUMNS + ("odometer",)
+    df = _read_results(columns=columns, filters=filters)
 
-    # Compute cohort year (firstRegYear)
-    df["firstRegYear"] = _cohort_first_reg_year(df)
-
-    # Ensure age buckets (drop rows with unknown age for age-based metrics)
-    # If age_at_test is NA, we can still contribute to cohort size but not to curves.
-    age_known = df["age_at_test"].notna()
-    df_age = df[age_known].copy()
+    # Compute cohort year (firstRegYear) and
+    # ensure age buckets (drop rows with unknown age for age-based metrics)
+    df_age = _age_frame(df, filters)
 
     # ---------- Pass rate by age ----------
     df_age["is_pass"] = (df_age["result"].astype(str) == "P").astype(int)
     pass_rate = (
-        df_age.groupby(["make","model","firstRegYear","age_at_test"], dropna=False)["is_pass"]
+        df_age.groupby(["make","model","firstRegYear","age_at_test"], dropna=False, observed=True)["is_pass"]
         .mean()
         .rename("pass_rate")
         .reset_index()
     )
 
     # ---------- Mileage percentiles by age ----------
-    miles_pct = (
-        df_age.groupby(["make","model","firstRegYear","age_at_test"], dropna=False)["odometer"]
-        .apply(_percentiles)
-        .reset_index()
-        .rename(columns={"odometer":"pct"})
-    )
-    # split tuple column into p50/p75/p90
-    miles_pct[["p50","p75","p90"]] = pd.DataFrame(miles_pct["pct"].tolist(), index=miles_pct.index)
-    miles_pct = miles_pct.drop(columns=["pct"])
+    if sketch:
+        keys = ["make","model","firstRegYear","age_at_test"]
+        miles_pct = sketch_percentiles(merge_sketches(build_mileage_sketches(filters=filters), keys), keys)
+    else:
+        miles_pct = _grouped_percentiles(df_age, ["make","model","firstRegYear","age_at_test"], "odometer")
 
     # ---------- Failure shares (optional) ----------
     fail_shares = _compute_failure_shares()  # None if not available
@@ -120,12 +314,30 @@ def compute_aggregates() -> pd.DataFrame:
         validate="one_to_one",
     )
 
+    # A make/model/year-filtered rebuild only replaces its own cohorts in the existing table
+    if _cohort_filtered(filters) and MOT_AGG_PARQUET.exists():
+        prev = pd.read_parquet(MOT_AGG_PARQUET)
+        out = pd.concat([prev[~_cohort_mask(prev, filters)], out], ignore_index=True)
+
     # Save primary aggregates
     MOT_AGG_PARQUET.parent.mkdir(parents=True, exist_ok=True)
     out.to_parquet(MOT_AGG_PARQUET, index=False)
     print(f"[aggregate_mot] wrote {len(out):,} rows -> {MOT_AGG_PARQUET}")
+    _drop_incremental_state()
+
+    _write_failure_shares(fail_shares)
+    return out
+
+def _drop_incremental_state() -> None:
+    """mot_agg.parquet was rewritten outside update_aggregates: its partial state no longer
+    matches, so the next incremental run rebuilds from scratch instead of splicing."""
+    if AGG_STATE_DIR.exists() or MOT_AGG_DIRTY_PARQUET.exists():
+        print(f"[aggregate_mot] dropping incremental state {AGG_STATE_DIR}; next incremental run rebuilds it")
+    shutil.rmtree(AGG_STATE_DIR, ignore_errors=True)
+    MOT_AGG_DIRTY_PARQUET.unlink(missing_ok=True)
 
-    # Save failure shares next to it if we have them
+def _write_failure_shares(fail_shares: pd.DataFrame | None) -> None:
+    # Save failure shares next to the aggregates if we have them
     if fail_shares is not None:
         p = INT / "failure_shares.parquet"
         fail_shares.to_parquet(p, index=False)
@@ -133,7 +345,89 @@ def compute_aggregates() -> pd.DataFrame:
     else:
         print("[aggregate_mot] no failures parquet found; skipping failure shares")
 
+def _partition_state(part: Path, bin_miles: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Mergeable partial aggregates for one test_year= partition: counts and mileage sketch."""
+    df_age = _age_frame(_read_results(part, PASS_RATE_COLUMNS + ("odometer",)))
+    df_age["is_pass"] = (df_age["result"].astype(str) == "P").astype(int)
+    counts = df_age.groupby(AGE_KEYS, dropna=False, observed=True)["is_pass"].agg(tests="size", passes="sum").reset_index()
+    return counts, mileage_sketch(df_age, AGE_KEYS, bin_miles=bin_miles)
+
+def _state_outputs(source_key: str) -> list[str]:
+    name = source_key.split("/", 1)[0]
+    return [(AGG_STATE_DIR / f"{name}.{kind}.parquet").relative_to(INT).as_posix() for kind in ("counts", "mileage")]
+
+def _state_for(keys: pd.DataFrame, pattern: str) -> list[pd.DataFrame]:
+    return [pd.read_parquet(p).merge(keys, on=AGE_KEYS) for p in sorted(AGG_STATE_DIR.glob(pattern))]
+
+def update_aggregates(bin_miles: int = MILEAGE_BIN_MILES, full: bool = FULL_REBUILD) -> pd.DataFrame:
+    """Incrementally refresh mot_agg.parquet from the partitions that changed since last run.
+
+    Writes the (make, model, firstRegYear) cohorts whose rows changed to
+    MOT_AGG_DIRTY_PARQUET so publishing can restrict itself to them.
+    """
+    root = Path(MOT_PARQUET)
+    sources = {p.relative_to(root).as_posix(): p for p in sorted(root.glob("test_year=*/*.parquet"))}
+    manifest_name = f"aggregate_mot.bin{bin_miles}"  # a new bin width invalidates all state
+    fresh_start = full or not MOT_AGG_PARQUET.exists() or not AGG_STATE_DIR.exists()
+    old = {} if fresh_start else load_manifest(manifest_name)
+    stale, fps = stale_sources(old, sources, INT)
+    touched = sorted({k.split("/", 1)[0] for k in stale} | {k.split("/", 1)[0] for k in set(old) - set(sources)})
+    print(f"[aggregate_mot] incremental: {len(touched)} test_year partition(s) changed")
+    if not touched:
+        out = pd.read_parquet(MOT_AGG_PARQUET)
+        out[["make","model","firstRegYear"]].iloc[:0].to_parquet(MOT_AGG_DIRTY_PARQUET, index=False)
+        print(f"[aggregate_mot] no dirty cohorts -> {MOT_AGG_DIRTY_PARQUET}")
+        return out
+
+    # Recompute partial state for the touched partitions; dirty groups are the union of the
+    # groups they covered before and after. A full rebuild starts from empty state, so
+    # leftovers of partitions that have since gone are not merged back in.
+    if not old:
+        shutil.rmtree(AGG_STATE_DIR, ignore_errors=True)
+    AGG_STATE_DIR.mkdir(parents=True, exist_ok=True)
+    dirty = []
+    for name in touched:
+        counts_path = AGG_STATE_DIR / f"{name}.counts.parquet"
+        miles_path = AGG_STATE_DIR / f"{name}.mileage.parquet"
+        if counts_path.exists() and old:
+            dirty.append(pd.read_parquet(counts_path, columns=AGE_KEYS))
+        if any((root / name).glob("*.parquet")):
+            counts, sk = _partition_state(root / name, bin_miles)
+            counts.to_parquet(counts_path, index=False)
+            sk.to_parquet(miles_path, index=False)
+            dirty.append(counts[AGE_KEYS])
+        else:
+            counts_path.unlink(missing_ok=True)
+            miles_path.unlink(missing_ok=True)
+    dirty_keys = pd.concat(dirty, ignore_index=True).drop_duplicates()
+
+    # Re-merge only the dirty groups from every partition's state
+    counts = pd.concat(_state_for(dirty_keys, "test_year=*.counts.parquet"), ignore_index=True)
+    counts = counts.groupby(AGE_KEYS, dropna=False, observed=True)[["tests","passes"]].sum().reset_index()
+    counts["pass_rate"] = counts["passes"] / counts["tests"]
+    miles = merge_sketches(_state_for(dirty_keys, "test_year=*.mileage.parquet"), AGE_KEYS)
+    fresh = counts[AGE_KEYS + ["pass_rate"]].merge(
+        sketch_percentiles(miles, AGE_KEYS, bin_miles=bin_miles), on=AGE_KEYS, how="outer", validate="one_to_one"
+    )
+
+    out = fresh
+    if old:
+        prev = pd.read_parquet(MOT_AGG_PARQUET)
+        flag = prev[AGE_KEYS].merge(dirty_keys.assign(_dirty=True), on=AGE_KEYS, how="left")["_dirty"]
+        out = pd.concat([prev[flag.isna().to_numpy()], fresh], ignore_index=True)
+    out = out.sort_values(AGE_KEYS, ignore_index=True)
+    out.to_parquet(MOT_AGG_PARQUET, index=False)
+    cohorts = dirty_keys[["make","model","firstRegYear"]].drop_duplicates()
+    cohorts.to_parquet(MOT_AGG_DIRTY_PARQUET, index=False)
+    print(f"[aggregate_mot] updated {len(fresh):,} of {len(out):,} rows -> {MOT_AGG_PARQUET}; "
+          f"{len(cohorts):,} dirty cohorts -> {MOT_AGG_DIRTY_PARQUET}")
+
+    save_manifest(manifest_name, {k: {**fps[k], "outputs": _state_outputs(k)} for k in sources})
+    _write_failure_shares(_compute_failure_shares())
     return out
 
 if __name__ == "__main__":
-    compute_aggregates()
+    if AGG_INCREMENTAL:
+        update_aggregates()
+    else:
+        compute_aggregates()
@@ -1,10 +1,106 @@
 from pathlib import Path
+from collections import Counter, defaultdict
+import difflib
+import os
 import pandas as pd
 import pyarrow.dataset as ds
-from .paths import MOT_PARQUET, CONF
-from .resolver import norm
+from .paths import MOT_PARQUET, CONF, VCA_PARQUET
+from .resolver import norm_series
+
+try:
+    # python-Levenshtein backed matcher when fuzzywuzzy[speedup] is installed
+    from fuzzywuzzy.fuzz import SequenceMatcher as _Matcher
+except Exception:
+    _Matcher = difflib.SequenceMatcher
 
 OUT = CONF / "model_aliases.csv"
+SUGGESTIONS = CONF / "model_alias_suggestions.csv"
+SUGGEST_TOP_N = int(os.environ.get("ETL_ALIAS_TOP_N", "3") or 3)
+SUGGEST_MIN_SCORE = int(os.environ.get("ETL_ALIAS_MIN_SCORE", "70") or 70)
+# Candidates (by shared tokens/trigrams) rescored with the fuzzy ratio per raw model
+_SHORTLIST = 8
+
+def _features(s: str) -> set:
+    """Word tokens plus character trigrams of the padded string."""
+    padded = f" {s} "
+    return set(s.split()) | {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _token_set_ratio(a: str, b: str) -> int:
+    """fuzzywuzzy's token_set_ratio for already-normalised strings."""
+    ta, tb = set(a.split()), set(b.split())
+    t0 = " ".join(sorted(ta & tb))
+    t1 = (t0 + " " + " ".join(sorted(ta - tb))).strip()
+    t2 = (t0 + " " + " ".join(sorted(tb - ta))).strip()
+    if t0 and (t0 == t1 or t0 == t2):
+        return 100
+    best = 0.0
+    for x, y in ((t0, t1), (t0, t2), (t1, t2)):
+        sm = _Matcher(None, x, y)
+        # quick ratios bound ratio() from above, so most losers skip the full match
+        if sm.real_quick_ratio() > best and sm.quick_ratio() > best:
+            best = max(best, sm.ratio())
+    return int(round(100 * best))
+
+def _canonical_models(existing: pd.DataFrame) -> pd.DataFrame:
+    """Curated alias targets plus VCA models, one row per (norm make, norm model)."""
+    frames = []
+    if len(existing) and {"canonical_make","canonical_model"}.issubset(existing.columns):
+        cur = existing.dropna(subset=["canonical_make","canonical_model"])
+        # Rows alias_seed title-cased itself are not curated targets
+        seeded = (cur["canonical_model"].astype(str) == norm_series(cur["model_raw"].astype(str)).str.title())
+        cur = cur[~seeded]
+        frames.append(pd.DataFrame({"make": cur["canonical_make"].astype(str), "model": cur["canonical_model"].astype(str)}))
+    if Path(VCA_PARQUET).exists():
+        vca = pd.read_parquet(VCA_PARQUET, columns=["norm_make","norm_model"]).drop_duplicates()
+        frames.append(pd.DataFrame({"make": vca["norm_make"].str.title(), "model": vca["norm_model"].str.title()}))
+    if not frames:
+        return pd.DataFrame(columns=["make","model","mk","md"])
+    canon = pd.concat(frames, ignore_index=True)
+    canon["mk"] = norm_series(canon["make"])
+    canon["md"] = norm_series(canon["model"])
+    canon = canon[canon["md"] != ""]
+    return canon.drop_duplicates(subset=["mk","md"], keep="first").reset_index(drop=True)
+
+def suggest_aliases(pairs: pd.DataFrame, canon: pd.DataFrame,
+                    top_n: int = SUGGEST_TOP_N, min_score: int = SUGGEST_MIN_SCORE) -> pd.DataFrame:
+    """Propose canonical targets for raw (make_raw, model_raw) pairs.
+
+    Canonical models are indexed per make by token/trigram, so each raw model is only
+    compared with canonicals of the same make that share a feature with it.
+    """
+    cols = ["make_raw","model_raw","suggested_make","suggested_model","score","rank"]
+    if pairs.empty or canon.empty:
+        return pd.DataFrame(columns=cols)
+    c_make, c_model, c_md = canon["make"].tolist(), canon["model"].tolist(), canon["md"].tolist()
+    index: dict = defaultdict(lambda: defaultdict(list))
+    for i, (mk, md) in enumerate(zip(canon["mk"], c_md)):
+        for f in _features(md):
+            index[mk][f].append(i)
+
+    mk_raw = norm_series(pairs["make_raw"].astype(str))
+    md_raw = norm_series(pairs["model_raw"].astype(str))
+    cache: dict = {}
+    rows = []
+    for make_raw, model_raw, mk, md in zip(pairs["make_raw"], pairs["model_raw"], mk_raw, md_raw):
+        key = (mk, md)
+        if key not in cache:
+            postings = index.get(mk)
+            found = []
+            if postings and md:
+                hits = Counter()
+                for f in _features(md):
+                    hits.update(postings.get(f, ()))
+                scored = []
+                for i, overlap in hits.most_common(_SHORTLIST):
+                    score = _token_set_ratio(md, c_md[i])
+                    if score >= min_score:
+                        scored.append((score, overlap, i))
+                scored.sort(key=lambda t: (-t[0], -t[1], t[2]))
+                found = [(c_make[i], c_model[i], score) for score, _, i in scored[:top_n]]
+            cache[key] = found
+        for rank, (s_make, s_model, score) in enumerate(cache[key], start=1):
+            rows.append((make_raw, model_raw, s_make, s_model, score, rank))
+    return pd.DataFrame(rows, columns=cols)
 
 def main():
     dataset = ds.dataset(MOT_PARQUET, format="parquet", partitioning="hive")
@@ -15,20 +111,33 @@ def main():
     table = dataset.to_table(columns=cols)
     df = table.to_pandas().dropna(subset=["make","model"])
     raw_pairs = (
-        df.groupby(["make","model"]).size().reset_index().drop(columns=0)
+        df.groupby(["make","model"], observed=True).size().reset_index().drop(columns=0)
         .rename(columns={"make":"make_raw","model":"model_raw"})
     )
     existing = pd.read_csv(OUT) if OUT.exists() else pd.DataFrame(columns=["make_raw","model_raw","canonical_make","canonical_model"])
-    def keyify(s): return norm(str(s))
-    existing["_key"] = existing["make_raw"].map(keyify) + "||" + existing["model_raw"].map(keyify)
-    raw_pairs["_key"] = raw_pairs["make_raw"].map(keyify) + "||" + raw_pairs["model_raw"].map(keyify)
+    def keyify(s): return norm_series(s.astype(str))
+    existing["_key"] = keyify(existing["make_raw"]) + "||" + keyify(existing["model_raw"])
+    raw_pairs["_key"] = keyify(raw_pairs["make_raw"]) + "||" + keyify(raw_pairs["model_raw"])
     missing = raw_pairs[~raw_pairs["_key"].isin(existing["_key"])].drop(columns=["_key"])
+    existing = existing.drop(columns=[c for c in existing.columns if c == "_key"])
+
+    # Suggestions for every pair that has no curated target yet (new, or only title-cased)
+    canon = _canonical_models(existing)
+    seeded = existing[existing["canonical_model"].astype(str) == keyify(existing["model_raw"]).str.title()]
+    unmapped = pd.concat([seeded[["make_raw","model_raw"]], missing[["make_raw","model_raw"]]], ignore_index=True)
+    sugg = suggest_aliases(unmapped, canon)
+    SUGGESTIONS.parent.mkdir(parents=True, exist_ok=True)
+    sugg.to_csv(SUGGESTIONS, index=False)
+    covered = len(sugg[["make_raw","model_raw"]].drop_duplicates())
+    print(f"Wrote {len(sugg)} suggestions for {covered} of "
+          f"{len(unmapped)} unmapped pairs → {SUGGESTIONS}")
+
     if not len(missing):
         print(f"No missing pairs. Alias file already covers {len(existing)} rows.")
         return
-    missing["canonical_make"]  = missing["make_raw"].map(lambda s: norm(str(s)).title())
-    missing["canonical_model"] = missing["model_raw"].map(lambda s: norm(str(s)).title())
-    out = pd.concat([existing.drop(columns=[c for c in existing.columns if c == "_key"]), missing], ignore_index=True)
+    missing["canonical_make"]  = keyify(missing["make_raw"]).str.title()
+    missing["canonical_model"] = keyify(missing["model_raw"]).str.title()
+    out = pd.concat([existing, missing], ignore_index=True)
     OUT.parent.mkdir(parents=True, exist_ok=True)
     out.to_csv(OUT, index=False)
     print(f"Appended {len(missing)} new rows → {OUT}")
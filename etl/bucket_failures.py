@@ -0,0 +1,154 @@
+# etl/bucket_failures.py
+"""
+Join failure items to test results on test_id and write the per-cohort failure
+category counts aggregate_mot turns into failure shares:
+
+  INT/failures_bucketed.parquet: make, model, firstRegYear, category, count
+
+Both inputs are far larger than memory, so this is a hash-partitioned join that
+spills to disk:
+  1. stream the results dataset and write (test_id, make, model, firstRegYear) into
+     ETL_FAILURE_BUCKETS spill files by hash(test_id);
+  2. stream the failure items, pre-count (test_id, category) per batch, and spill them
+     the same way;
+  3. join each bucket pair in memory (each is ~1/N of the data) and sum the counts.
+"""
+
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .paths import INT, MOT_PARQUET, FAILURES_PARQUET
+from .aggregate_mot import _cohort_first_reg_year
+
+OUT_PARQUET = INT / "failures_bucketed.parquet"
+SPILL_DIR = INT / "failures_spill"
+# Hash partitions; peak memory in the join phase is roughly (results + failures) / N_BUCKETS.
+N_BUCKETS = int(os.environ.get("ETL_FAILURE_BUCKETS", "64") or 64)
+BATCH_ROWS = int(os.environ.get("ETL_FAILURE_BATCH_ROWS", "1000000") or 1000000)
+WORKERS = int(os.environ.get("ETL_FAILURE_WORKERS", "0") or 0) or (os.cpu_count() or 1)
+
+_DICT = pa.dictionary(pa.int32(), pa.string())
+RESULTS_SPILL_SCHEMA = pa.schema([
+    ("test_id", pa.int64()), ("make", _DICT), ("model", _DICT), ("firstRegYear", pa.int64()),
+])
+FAILURES_SPILL_SCHEMA = pa.schema([("test_id", pa.int64()), ("category", _DICT), ("count", pa.int64())])
+KEYS = ["make","model","firstRegYear","category"]
+
+def _bucket_of(test_id: pd.Series, n: int) -> np.ndarray:
+    return (pd.util.hash_array(test_id.to_numpy(dtype=np.int64)) % np.uint64(n)).astype(np.int64)
+
+class _Spill:
+    """One append-only Parquet writer per hash bucket."""
+
+    def __init__(self, root: Path, schema: pa.Schema, n: int):
+        self.root, self.schema, self.n = root, schema, n
+        self.writers: dict[int, pq.ParquetWriter] = {}
+        root.mkdir(parents=True, exist_ok=True)
+
+    def write(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        bucket = _bucket_of(df["test_id"], self.n)
+        order = np.argsort(bucket, kind="stable")
+        df, bucket = df.iloc[order], bucket[order]
+        bounds = np.flatnonzero(np.diff(bucket)) + 1
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(bucket)]):
+            b = int(bucket[lo])
+            if b not in self.writers:
+                self.writers[b] = pq.ParquetWriter(self.root / f"b={b:04d}.parquet", self.schema)
+            self.writers[b].write_table(pa.Table.from_pandas(df.iloc[lo:hi], schema=self.schema, preserve_index=False))
+
+    def close(self) -> None:
+        for w in self.writers.values():
+            w.close()
+
+def _spill_results(root: Path, n: int, batch_rows: int) -> int:
+    dataset = ds.dataset(MOT_PARQUET, format="parquet", partitioning="hive")
+    names = dataset.schema.names
+    if "test_id" not in names:
+        raise KeyError("Results Parquet has no test_id column; re-run ingest_results")
+    cols = [c for c in ("test_id","make","model","test_date","age_at_test","first_use_date") if c in names]
+    spill, rows = _Spill(root, RESULTS_SPILL_SCHEMA, n), 0
+    try:
+        for batch in dataset.to_batches(columns=cols, batch_size=batch_rows):
+            df = batch.to_pandas()
+            if "age_at_test" not in df.columns:
+                df["age_at_test"] = pd.Series(pd.NA, index=df.index, dtype="Int64")
+            if "first_use_date" not in df.columns:
+                df["first_use_date"] = pd.NaT
+            df["firstRegYear"] = _cohort_first_reg_year(df)
+            df = df.dropna(subset=["test_id","firstRegYear"])
+            spill.write(df[["test_id","make","model","firstRegYear"]].astype({"test_id": "int64", "firstRegYear": "int64"}))
+            rows += len(df)
+    finally:
+        spill.close()
+    return rows
+
+def _spill_failures(root: Path, n: int, batch_rows: int) -> int:
+    dataset = ds.dataset(FAILURES_PARQUET, format="parquet")
+    if "test_id" not in dataset.schema.names:
+        raise KeyError("Failures Parquet has no test_id column; cannot join to results")
+    spill, rows = _Spill(root, FAILURES_SPILL_SCHEMA, n), 0
+    try:
+        for batch in dataset.to_batches(columns=["test_id","fail_bucket"], batch_size=batch_rows):
+            df = batch.to_pandas()
+            df["test_id"] = pd.to_numeric(df["test_id"], errors="coerce")
+            df = df.dropna(subset=["test_id"])
+            rows += len(df)
+            # Several items per test usually share a category; count them before spilling
+            counts = (
+                df.groupby([df["test_id"].astype("int64"), df["fail_bucket"].rename("category")], observed=True)
+                .size().rename("count").reset_index()
+            )
+            spill.write(counts)
+    finally:
+        spill.close()
+    return rows
+
+def _join_bucket(res_path: Path, fail_path: Path) -> pd.DataFrame:
+    res = pd.read_parquet(res_path)
+    fail = pd.read_parquet(fail_path)
+    joined = fail.merge(res, on="test_id", how="inner")
+    return joined.groupby(KEYS, observed=True)["count"].sum().reset_index()
+
+def bucket_failures(n_buckets: int = N_BUCKETS, batch_rows: int = BATCH_ROWS, workers: int = WORKERS) -> pd.DataFrame:
+    shutil.rmtree(SPILL_DIR, ignore_errors=True)
+    res_root, fail_root = SPILL_DIR / "results", SPILL_DIR / "failures"
+    try:
+        n_res = _spill_results(res_root, n_buckets, batch_rows)
+        n_fail = _spill_failures(fail_root, n_buckets, batch_rows)
+        print(f"[bucket_failures] spilled {n_res:,} results and {n_fail:,} failure items into {n_buckets} buckets")
+
+        pairs = [(res_root / p.name, p) for p in sorted(fail_root.glob("b=*.parquet")) if (res_root / p.name).exists()]
+        workers = max(1, min(workers, len(pairs)))
+        if workers == 1:
+            parts = [_join_bucket(*pair) for pair in pairs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(_join_bucket, *zip(*pairs)))
+    finally:
+        shutil.rmtree(SPILL_DIR, ignore_errors=True)
+
+    parts = [p for p in parts if len(p)]
+    if parts:
+        # Buckets are disjoint in test_id, not in cohort, so sum across them
+        out = pd.concat(parts, ignore_index=True).astype({c: str for c in ("make","model","category")})
+        out = out.groupby(KEYS, observed=True)["count"].sum().reset_index()
+    else:
+        out = pd.DataFrame({"make": pd.Series(dtype=str), "model": pd.Series(dtype=str),
+                            "firstRegYear": pd.Series(dtype="int64"), "category": pd.Series(dtype=str),
+                            "count": pd.Series(dtype="int64")})
+    out.to_parquet(OUT_PARQUET, index=False)
+    print(f"[bucket_failures] wrote {len(out):,} cohort/category rows -> {OUT_PARQUET}")
+    return out
+
+if __name__ == "__main__":
+    bucket_failures()
@@ -17,6 +17,8 @@ import pyarrow.dataset as ds
 import pyarrow.parquet as pq
 from .paths import RAW, INT
 from .resolver import normalise_df
+from .dates import parse_dates
+from .manifest import FULL_REBUILD, source_key, load_manifest, save_manifest, stale_sources, drop_outputs
 
 OUT_DIR = INT / "mot"
 
@@ -39,12 +41,23 @@ def _normalize_result(s: pd.Series) -> pd.Series:
     return s.map(m).fillna(s)
 
 def _parse_date(col: pd.Series) -> pd.Series:
-    # Your CSV looks like m/d/yy; allow flexibility
-    return pd.to_datetime(col, errors="coerce", dayfirst=False, infer_datetime_format=True)
+    # Your CSV looks like m/d/yy; the format is detected from the distinct values
+    return parse_dates(col, utc=False, dayfirst=False)
 
-def ingest_csv_to_parquet(csv_path: str, out_dir: Path = OUT_DIR):
+def ingest_csv_to_parquet(csv_path: str, out_dir: Path = OUT_DIR, full: bool = FULL_REBUILD):
     out_dir.mkdir(parents=True, exist_ok=True)
 
+    # Skip sources whose fingerprint matches the manifest; otherwise replace only
+    # this source's part files in the first_use_year= partitions.
+    src = Path(csv_path).resolve()
+    key = src.as_posix()
+    manifest = load_manifest("download_mot")
+    stale, fps = stale_sources({} if full else manifest, {key: src}, out_dir)
+    if not stale:
+        print(f"Unchanged since last run, skipping {csv_path}")
+        return
+    drop_outputs(manifest.get(key), out_dir)
+
     usecols = [
         "test_id","vehicle_id","test_date","test_class_id","test_type","test_result",
         "test_mileage","postcode_area","make","model","colour","fuel_type",
@@ -79,12 +92,17 @@ def ingest_csv_to_parquet(csv_path: str, out_dir: Path = OUT_DIR):
 
     # Write partitioned Parquet by first_use_year
     table = pa.Table.from_pandas(df)
+    prefix = f"part-{source_key(key)}"
     pq.write_to_dataset(
         table,
         root_path=str(out_dir),
         partition_cols=["first_use_year"],
+        basename_template=prefix + "-{i}.parquet",
         existing_data_behavior="overwrite_or_ignore",
     )
+    outputs = sorted(p.relative_to(out_dir).as_posix() for p in out_dir.glob(f"first_use_year=*/{prefix}-*.parquet"))
+    manifest[key] = {**fps[key], "outputs": outputs}
+    save_manifest("download_mot", manifest)
     print(f"Wrote partitioned Parquet to {out_dir}")
 
 if __name__ == "__main__":
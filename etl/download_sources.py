@@ -1,28 +1,113 @@
 from __future__ import annotations
-import io, zipfile, sys
+import hashlib, os, re, sys, time, zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import requests
 from .paths import RAW
 
-def _download(url: str) -> bytes:
-    r = requests.get(url, timeout=180)
-    r.raise_for_status()
-    return r.content
+CHUNK_BYTES = 1 << 20
+RETRIES = int(os.environ.get("ETL_DOWNLOAD_RETRIES", "5") or 5)
+TIMEOUT = 180
+# Left as archives under RAW/<name>/; only the small lookups archive is extracted
+KEEP_ZIPPED = ("results", "failures")
 
-def _save_zip(content: bytes, out_dir: Path, name: str) -> None:
-    out_dir.mkdir(parents=True, exist_ok=True)
-    (out_dir / f"{name}.zip").write_bytes(content)
-    with zipfile.ZipFile(io.BytesIO(content)) as z:
+class _ServerError(IOError):
+    """A 5xx response; retried with backoff like a dropped connection."""
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for b in iter(lambda: f.read(CHUNK_BYTES), b""):
+            h.update(b)
+    return h.hexdigest()
+
+def _total_size(r: requests.Response, offset: int) -> int | None:
+    """Full size of the remote file from Content-Range (206/416) or Content-Length (200)."""
+    m = re.match(r"bytes (?:\d+-\d+|\*)/(\d+)", r.headers.get("Content-Range", ""))
+    if m:
+        return int(m.group(1))
+    n = r.headers.get("Content-Length")
+    return int(n) + offset if n is not None and n.isdigit() else None
+
+def _download(url: str, dest: Path, sha256: str | None = None, retries: int = RETRIES) -> Path:
+    """Stream `url` to `dest` in chunks via dest.part, resuming with Range after a drop.
+
+    The finished file is checked against the server's size and, if given, a sha256.
+    """
+    part = dest.with_name(dest.name + ".part")
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    total = None
+    for attempt in range(retries + 1):
+        offset = part.stat().st_size if part.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with requests.get(url, headers=headers, stream=True, timeout=TIMEOUT) as r:
+                if r.status_code == 416:
+                    # Nothing left to fetch only if the partial file is exactly the remote size
+                    remote = _total_size(r, 0) if "Content-Range" in r.headers else None
+                    if remote is not None and remote == offset:
+                        total = remote
+                        break
+                    print(f"[download] {dest.name}: {offset:,}-byte partial does not match the remote "
+                          f"size ({remote if remote is not None else 'unknown'}); restarting")
+                    part.unlink()
+                    continue
+                if r.status_code >= 500:
+                    raise _ServerError(f"HTTP {r.status_code}")
+                r.raise_for_status()
+                if r.status_code == 200 and offset:
+                    offset = 0  # server ignored Range; start over
+                total = _total_size(r, offset)
+                with open(part, "ab" if offset else "wb") as f:
+                    for chunk in r.iter_content(CHUNK_BYTES):
+                        f.write(chunk)
+            if total is None or part.stat().st_size >= total:
+                break
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError, _ServerError) as e:
+            if attempt == retries:
+                raise
+            print(f"[download] {dest.name}: {e.__class__.__name__} at {part.stat().st_size if part.exists() else 0:,} bytes; resuming")
+            time.sleep(min(2 ** attempt, 30))
+    else:
+        raise IOError(f"{url}: gave up after {retries} retries")
+
+    size = part.stat().st_size
+    if total is not None and size != total:
+        part.unlink()
+        raise IOError(f"{url}: got {size:,} bytes, expected {total:,}")
+    if sha256 and _sha256(part) != sha256.lower():
+        part.unlink()
+        raise IOError(f"{url}: sha256 mismatch")
+    part.replace(dest)
+    return dest
+
+def _save_zip(zip_path: Path, out_dir: Path, name: str) -> None:
+    with zipfile.ZipFile(zip_path) as z:
         z.extractall(out_dir / name)
 
-def download_all(results_zip_url: str, failures_zip_url: str, lookups_zip_url: str):
-    print("Downloading results…");  _save_zip(_download(results_zip_url), RAW, "results")
-    print("Downloading failures…"); _save_zip(_download(failures_zip_url), RAW, "failures")
-    print("Downloading lookups…");  _save_zip(_download(lookups_zip_url),  RAW, "lookups")
-    print("Saved under", RAW)
+def _fetch(name: str, url: str, out_dir: Path, sha256: str | None) -> None:
+    print(f"Downloading {name}…")
+    if name in KEEP_ZIPPED:
+        # The ingest stages stream CSVs straight out of the archive (see sources.py)
+        zip_path = _download(url, out_dir / name / f"{name}.zip", sha256)
+    else:
+        zip_path = _download(url, out_dir / f"{name}.zip", sha256)
+        _save_zip(zip_path, out_dir, name)
+    print(f"Saved {name} ({zip_path.stat().st_size:,} bytes)")
+
+def download_all(results_zip_url: str, failures_zip_url: str, lookups_zip_url: str,
+                 sha256: dict[str, str] | None = None, out_dir: Path | None = None):
+    """Fetch the three archives concurrently; `sha256` optionally maps name -> digest."""
+    out_dir = out_dir or RAW
+    sha256 = sha256 or {}
+    jobs = {"results": results_zip_url, "failures": failures_zip_url, "lookups": lookups_zip_url}
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = [pool.submit(_fetch, name, url, out_dir, sha256.get(name)) for name, url in jobs.items()]
+        for fut in futures:
+            fut.result()
+    print("Saved under", out_dir)
 
 if __name__ == "__main__":
     if len(sys.argv) != 4:
         raise SystemExit("Usage: python -m etl.download_sources <results.zip> <failures.zip> <lookups.zip>")
     download_all(sys.argv[1], sys.argv[2], sys.argv[3])
-
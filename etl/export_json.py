@@ -1,26 +1,70 @@
 # etl/export_json.py
-import json, os
+import json, os, re
+from collections import defaultdict
 from pathlib import Path
 from typing import Dict, Any
+import numpy as np
+
+from .precompress import FORMATS as PRECOMPRESS, needs_siblings, precompress_files, remove_siblings
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def _words(s: str) -> tuple[str, ...]:
+    return tuple(_WORD_RE.findall(s.lower()))
+
+class _PhraseIndex:
+    """Rows whose text column contains a model name as whole words, per make.
+
+    Distinct (make, text) values are tokenised once and indexed by word, so a lookup
+    only checks texts that contain the phrase's first word ("ka" never hits "kadjar").
+    """
+
+    def __init__(self, df, text_col: str):
+        self.texts: list[tuple[tuple[str, ...], np.ndarray]] = []
+        self.postings: dict[tuple[str, str], list[tuple[int, int]]] = defaultdict(list)
+        if df is None or df.empty:
+            return
+        groups = df.groupby([df["make"].str.lower(), df[text_col]], sort=False).indices
+        for (mk, text), rows in groups.items():
+            words = _words(str(text))
+            t = len(self.texts)
+            self.texts.append((words, rows))
+            for pos, w in enumerate(words):
+                self.postings[(mk, w)].append((t, pos))
+
+    def rows(self, make: str, phrase: str) -> np.ndarray:
+        """Positional rows of `make` whose text contains `phrase` word-for-word."""
+        q = _words(phrase)
+        if not q:
+            return np.empty(0, dtype=np.intp)
+        hits = {
+            t for t, pos in self.postings.get((make.lower(), q[0]), ())
+            if self.texts[t][0][pos:pos + len(q)] == q
+        }
+        if not hits:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate([self.texts[t][1] for t in hits]))
 
 def write_cohort_json(root: Path, aggregates: Dict[str, Any], recalls_df, vca_df):
     root.mkdir(parents=True, exist_ok=True)
+    # Recalls and VCA rows are matched once per (make, model), not per cohort year
+    rec_index = _PhraseIndex(recalls_df, "model")
+    vca_index = _PhraseIndex(vca_df, "model_family")
+    to_compress = []
     for make, models in aggregates.items():
         for model, years in models.items():
-            for year, metrics in years.items():
-                # attach recall timeline
-                rec = (
-                    recalls_df[(recalls_df["make"].str.lower()==make.lower()) &
-                               (recalls_df["model"].str.contains(model, case=False, na=False))]
-                    .groupby("year")["count"].sum().reset_index().to_dict(orient="records")
-                )
-                # CO2 & MPG (take median across variants)
-                vc = vca_df[(vca_df["make"].str.lower()==make.lower()) &
-                            (vca_df["model_family"].str.contains(model, case=False, na=False))]
-                co2 = float(vc["co2"].median()) if not vc.empty else None
-                mpg = float(vc["mpg_combined"].median()) if not vc.empty else None
-                cycle = vc["test_cycle"].mode()[0] if not vc.empty else None
+            # attach recall timeline
+            rec = (
+                recalls_df.iloc[rec_index.rows(make, model)]
+                .groupby("year")["count"].sum().reset_index().to_dict(orient="records")
+            )
+            # CO2 & MPG (take median across variants)
+            vc = vca_df.iloc[vca_index.rows(make, model)]
+            co2 = float(vc["co2"].median()) if not vc.empty else None
+            mpg = float(vc["mpg_combined"].median()) if not vc.empty else None
+            cycle = vc["test_cycle"].mode()[0] if not vc.empty else None
 
+            for year, metrics in years.items():
                 payload = {
                     "make": make, "model": model, "firstRegYear": year,
                     **metrics,
@@ -30,5 +74,13 @@ def write_cohort_json(root: Path, aggregates: Dict[str, Any], recalls_df, vca_df
 
                 out_dir = root / make.lower().replace(" ","-") / model.lower().replace(" ","-")
                 out_dir.mkdir(parents=True, exist_ok=True)
-                with open(out_dir / f"{year}.json", "w", encoding="utf-8") as f:
-                    json.dump(payload, f, ensure_ascii=False, separators=(",",":"))
+                out_path = out_dir / f"{year}.json"
+                data = json.dumps(payload, ensure_ascii=False, separators=(",",":")).encode("utf-8")
+                changed = not out_path.exists() or out_path.read_bytes() != data
+                if changed:
+                    out_path.write_bytes(data)
+                    remove_siblings(out_path, keep=PRECOMPRESS)
+                if PRECOMPRESS and (changed or needs_siblings(out_path, PRECOMPRESS)):
+                    to_compress.append(out_path)
+    # .gz/.br siblings only for documents whose bytes changed (or lack siblings)
+    precompress_files(to_compress, PRECOMPRESS)
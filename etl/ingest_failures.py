@@ -1,52 +1,99 @@
 from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 import pandas as pd
 import pyarrow.parquet as pq
 import pyarrow as pa
-from .paths import RAW, INT
-from .lookups import load_lookup_tables, build_rfr_bucket_map
+from .paths import RAW, INT, FAILURES_PARQUET
+from .lookups import cached_lookups
+from .ingest_results import BATCH_ROWS, WORKERS, part_name
+from .sources import CsvSource, find_csv_sources
+from .manifest import FULL_REBUILD, load_manifest, save_manifest, stale_sources, drop_outputs
 
-def _find_failures_csv():
-    cand = list((RAW / "failures").rglob("*.csv"))
+def _find_failures_csvs() -> list[CsvSource]:
+    cand = find_csv_sources(RAW / "failures")
     if not cand:
-        raise FileNotFoundError("No failure items CSV under data_raw/failures")
-    return max(cand, key=lambda p: p.stat().st_size)
+        raise FileNotFoundError("No failure items CSV (or zipped CSV) under data_raw/failures")
+    return cand
 
-def ingest_failures():
-    fail_csv = _find_failures_csv()
-    df = pd.read_csv(fail_csv, dtype=str, low_memory=False)
-
-    def pick(*alts: str) -> str:
+def _resolve_columns(columns) -> dict[str, str | None]:
+    def find(*alts: str) -> str | None:
         for a in alts:
-            if a in df.columns: return a
+            if a in columns: return a
         for a in alts:
-            for c in df.columns:
+            for c in columns:
                 if c.lower() == a.lower(): return c
-        raise KeyError(f"None of columns {alts} found in failures CSV")
-
-    test_id_col = None
-    for a in ("test_id","testnumber","test_no"):
-        if a in df.columns: test_id_col = a; break
-        for c in df.columns:
-            if c.lower() == a.lower(): test_id_col = c; break
-
-    rfr_code_col = pick("rfr_code","rfrid","rfr_id","item_id","defect_id","rfrCode")
-    deficiency_col = next((c for c in df.columns if "deficiency" in c.lower()), None)
-
-    look = load_lookup_tables(RAW / "lookups")
-    rfr_bucket_map = build_rfr_bucket_map(look.get("rfr")) if "rfr" in look else {}
-
-    out = pd.DataFrame({
-        "rfr_code": df[rfr_code_col].astype(str),
-        "fail_bucket": df[rfr_code_col].astype(str).map(lambda c: rfr_bucket_map.get(c, "other")),
-    })
-    if deficiency_col:
-        out["deficiency"] = df[deficiency_col].astype(str).str.lower()
-    if test_id_col:
-        out["test_id"] = df[test_id_col].astype(str)
-
-    out_path = INT / "failures.parquet"
-    pq.write_table(pa.Table.from_pandas(out), out_path)
-    print(f"[ingest_failures] wrote {out_path}")
+        return None
+
+    rfr_code_col = find("rfr_code","rfrid","rfr_id","item_id","defect_id","rfrCode")
+    if rfr_code_col is None:
+        raise KeyError("None of columns ('rfr_code', 'rfrid', 'rfr_id', 'item_id', 'defect_id', 'rfrCode') found in failures CSV")
+    return {
+        "rfr_code": rfr_code_col,
+        "deficiency": next((c for c in columns if "deficiency" in c.lower()), None),
+        "test_id": find("test_id","testnumber","test_no"),
+    }
+
+def _ingest_failures_csv(src: CsvSource, out_path: Path, rfr_bucket_map: dict[str, str],
+                         batch_rows: int = BATCH_ROWS) -> int:
+    """Stream one failure items CSV into its part file, batch_rows rows at a time."""
+    print(f"[ingest_failures] reading {src} in batches of {batch_rows:,} rows")
+    with src.open() as f:
+        cols = _resolve_columns(list(pd.read_csv(f, dtype=str, nrows=0).columns))
+    schema = pa.schema([(name, pa.string()) for name in ("rfr_code","fail_bucket","deficiency","test_id")
+                        if name in ("rfr_code","fail_bucket") or cols[name]])
+
+    rows = 0
+    with pq.ParquetWriter(out_path, schema) as writer, src.open() as f:
+        for df in pd.read_csv(f, dtype=str, chunksize=batch_rows):
+            codes = df[cols["rfr_code"]].astype(str)
+            out = pd.DataFrame({
+                "rfr_code": codes,
+                # one hash lookup per row in Series.map, no Python call per row
+                "fail_bucket": codes.map(rfr_bucket_map).fillna("other") if rfr_bucket_map else "other",
+            })
+            if cols["deficiency"]:
+                out["deficiency"] = df[cols["deficiency"]].astype(str).str.lower()
+            if cols["test_id"]:
+                out["test_id"] = df[cols["test_id"]].astype(str)
+            writer.write_table(pa.Table.from_pandas(out, schema=schema, preserve_index=False))
+            rows += len(out)
+    return rows
+
+def ingest_failures(workers: int = WORKERS, full: bool = FULL_REBUILD, batch_rows: int = BATCH_ROWS):
+    src_root = RAW / "failures"
+    sources = {src.key(src_root): src for src in _find_failures_csvs()}
+
+    rfr_bucket_map = cached_lookups(RAW / "lookups")["rfr_bucket"]
+
+    # Only new/changed source files are re-parsed; each owns exactly one part file.
+    legacy = INT / "failures.parquet"  # single-file output of older versions
+    if legacy.is_file():
+        print(f"[ingest_failures] removing obsolete {legacy} (now a dataset under {FAILURES_PARQUET})")
+        legacy.unlink()
+    FAILURES_PARQUET.mkdir(parents=True, exist_ok=True)
+    old = {} if full else load_manifest("ingest_failures")
+    if not old:
+        for part in FAILURES_PARQUET.glob("part*.parquet"):
+            part.unlink()
+    stale, fps = stale_sources(old, sources, FAILURES_PARQUET)
+    for key in set(old) - set(sources):
+        drop_outputs(old[key], FAILURES_PARQUET)
+
+    names = {k: part_name(sources[k], src_root) for k in stale}
+    jobs = [(sources[k], FAILURES_PARQUET / names[k], rfr_bucket_map, batch_rows) for k in stale]
+    workers = max(1, min(workers, len(jobs)))
+    print(f"[ingest_failures] {len(jobs)}/{len(sources)} CSV file(s) new or changed under {src_root}, {workers} worker(s)")
+    if workers == 1:
+        rows = sum(_ingest_failures_csv(*job) for job in jobs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = sum(pool.map(_ingest_failures_csv, *zip(*jobs)))
+
+    manifest = {k: {**fps[k], "outputs": old[k].get("outputs", [])} for k in sources if k not in stale}
+    manifest.update({k: {**fps[k], "outputs": [names[k]]} for k in stale})
+    save_manifest("ingest_failures", manifest)
+    print(f"[ingest_failures] wrote {FAILURES_PARQUET} ({rows:,} rows)")
 
 if __name__ == "__main__":
     ingest_failures()
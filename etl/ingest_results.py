@@ -6,24 +6,55 @@ Handles both legacy and 2024 column layouts:
 - fuel:  either 'fuel_type_code' OR 'fuel_type' (e.g. PE/DI)
 - result: either 'result'/'result_code' OR 'test_result' (P/F)
 - date:   prefer 'completed_date' (ISO) else 'test_date'
+
+make/model/result/fuel_type (and test class/type) are stored dictionary-encoded,
+odometer as int32, age_at_test as int16 and test_id (when present) as int64.
+
+Every CSV under data_raw/results, and every CSV inside a zip archive there (streamed
+out of the archive, never extracted), is ingested (one worker process per file) and
+streamed in batches of ETL_INGEST_BATCH_ROWS rows and appended to the
+test_year= partitions through incremental Parquet writers.
 """
 
 from __future__ import annotations
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import os
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime
 
 from .paths import RAW, INT, MOT_PARQUET
+from .dates import parse_dates
+from .lookups import cached_lookups, LOOKUP_CACHE
+from .sources import CsvSource, find_csv_sources
+from .manifest import FULL_REBUILD, source_key, load_manifest, save_manifest, stale_sources, drop_outputs
 
 pd.options.mode.chained_assignment = None  # quieten SettingWithCopy warnings
 
+# Rows per CSV batch; peak memory is a small multiple of this, independent of file size.
+BATCH_ROWS = int(os.environ.get("ETL_INGEST_BATCH_ROWS", "500000") or 500000)
+# Source files are ingested in parallel, one process per CSV.
+WORKERS = int(os.environ.get("ETL_INGEST_WORKERS", "0") or 0) or (os.cpu_count() or 1)
+# Bumped whenever the Parquet schema changes; older manifests force a full re-ingest.
+SCHEMA_VERSION = 3
+# Low-cardinality strings are dictionary-encoded and come back from pyarrow as pandas categoricals.
+_DICT = pa.dictionary(pa.int32(), pa.string())
+
 
-def _find_biggest_csv_under(folder: Path) -> Path:
-    cands = list(folder.rglob("*.csv"))
+def find_csvs_under(folder: Path) -> list[CsvSource]:
+    """CSV files under `folder` and CSV members of zip archives under it (read in place)."""
+    cands = find_csv_sources(folder)
     if not cands:
-        raise FileNotFoundError(f"No CSV files found under {folder}")
-    return max(cands, key=lambda p: p.stat().st_size)
+        raise FileNotFoundError(f"No CSV files (or zipped CSVs) found under {folder}")
+    return cands
+
+
+def part_name(src: CsvSource, root: Path) -> str:
+    """Stable per-source Parquet file name, so parallel workers never collide."""
+    return f"part-{source_key(src.key(root))}.parquet"
 
 
 def _pick(df: pd.DataFrame, *alts: str) -> str:
@@ -44,121 +75,115 @@ def _pick(df: pd.DataFrame, *alts: str) -> str:
 
 
 def _parse_date(series: pd.Series) -> pd.Series:
-    # Try ISO first, then day/month/2-digit-year with ambiguity handling
-    s = pd.to_datetime(series, errors="coerce", utc=True)
-    if s.notna().any():
-        return s
-    # Fallback patterns commonly seen in test_date like 12/13/24
-    # Prefer month/day/year because DVSA exports often follow US-style in this field.
-    s = pd.to_datetime(series, errors="coerce", format="%m/%d/%y", utc=True)
-    # If still NaT, try UK-style just in case
-    s2 = pd.to_datetime(series, errors="coerce", dayfirst=True, utc=True)
-    return s.where(s.notna(), s2)
+    # Format detected from the distinct values (ISO, then US-style m/d/yy as DVSA test_date
+    # exports use); anything the detected format can't read falls back to day-first.
+    return parse_dates(series, utc=True, dayfirst=True)
 
 
 def _maybe_load_fuel_lookup() -> dict[str, str]:
-    """Try to read a fuel lookup table from RAW/lookups (optional)."""
-    look_dir = RAW / "lookups"
-    if not look_dir.exists():
-        return {}
-    out = {}
-    for p in look_dir.rglob("*.csv"):
-        try:
-            df = pd.read_csv(p, dtype=str, low_memory=False).rename(columns=str.lower)
-        except Exception:
-            continue
-        # Heuristics for a simple code->name mapping
-        # Accept any frame that looks like: ['fuel_type_code', 'fuel_type'] or similar
-        candidates = [
-            ("fuel_type_code", "fuel_type"),
-            ("fuelcode", "fueltype"),
-            ("code", "fuel_type"),
-            ("fuel_type_code", "description"),
-            ("code", "description"),
-        ]
-        for code_col, name_col in candidates:
-            if code_col in df.columns and name_col in df.columns:
-                mapping = (
-                    df[[code_col, name_col]]
-                    .dropna()
-                    .drop_duplicates()
-                    .set_index(code_col)[name_col]
-                    .to_dict()
-                )
-                # Keep first mapping we find; later files won't override existing keys
-                for k, v in mapping.items():
-                    out.setdefault(str(k).strip(), str(v).strip())
-                break
-    # Add tiny safety net for the common 2024 short codes
-    out.setdefault("PE", "Petrol")
-    out.setdefault("DI", "Diesel")
-    out.setdefault("EL", "Electric")
-    out.setdefault("HE", "Hybrid")
-    return out
-
-
-def ingest_results() -> None:
-    src_root = RAW / "results"
-    if not src_root.exists():
-        raise FileNotFoundError("Expected data under data_raw/results (did you run the download step?)")
-
-    csv_path = _find_biggest_csv_under(src_root)
-    print(f"[ingest_results] reading {csv_path}")
+    """Fuel code -> name from RAW/lookups (optional), via the shared lookup cache."""
+    return cached_lookups(RAW / "lookups", INT / LOOKUP_CACHE.name)["fuel_codes"]
 
-    # Read in chunks if you want to reduce memory; for now load whole file
-    df = pd.read_csv(csv_path, dtype=str, low_memory=False)
-    df.columns = [c.strip() for c in df.columns]
 
-    # Resolve required columns with flexibility
-    make_col = _pick(df, "make")
-    model_col = _pick(df, "model")
+def _resolve_columns(header: pd.DataFrame) -> dict[str, str | None]:
+    """Map the roles we need onto the CSV's actual column names (done once per file)."""
+    cols: dict[str, str | None] = {
+        "make": _pick(header, "make"),
+        "model": _pick(header, "model"),
+    }
 
     # dates: prefer completed_date (ISO) else test_date
-    date_col = None
+    cols["date"] = None
     for alt in ("completed_date", "completeddate", "test_date", "testdate"):
         try:
-            date_col = _pick(df, alt)
+            cols["date"] = _pick(header, alt)
             break
         except KeyError:
             continue
-    if date_col is None:
+    if cols["date"] is None:
         raise KeyError("No date column found (expected 'completed_date' or 'test_date').")
 
     # odometer / mileage
-    mileage_col = _pick(df, "test_mileage", "odometer", "odometer_value", "mileage")
+    cols["mileage"] = _pick(header, "test_mileage", "odometer", "odometer_value", "mileage")
 
     # result: allow result_code/result/test_result
     try:
-        result_col = _pick(df, "result_code", "result", "test_result")
+        cols["result"] = _pick(header, "result_code", "result", "test_result")
     except KeyError:
         # Some exports use 'testresult'
-        result_col = _pick(df, "testresult")
+        cols["result"] = _pick(header, "testresult")
 
     # fuel: allow code or already-short code column
     try:
-        fuel_code_col = _pick(df, "fuel_type_code", "fuel_code", "fueltypecode")
-        fuel_val = df[fuel_code_col].astype(str).str.strip()
+        cols["fuel"] = _pick(header, "fuel_type_code", "fuel_code", "fueltypecode")
     except KeyError:
         # Fall back to 'fuel_type' (e.g., PE, DI)
-        fuel_col = _pick(df, "fuel_type", "fueltype")
-        fuel_val = df[fuel_col].astype(str).str.strip()
+        cols["fuel"] = _pick(header, "fuel_type", "fueltype")
 
     # Optional first-use date to compute age
     try:
-        first_use_col = _pick(df, "first_use_date", "firstusedate", "first_use", "firstregistrationdate")
-        first_use = _parse_date(df[first_use_col])
+        cols["first_use"] = _pick(header, "first_use_date", "firstusedate", "first_use", "firstregistrationdate")
+    except KeyError:
+        cols["first_use"] = None
+
+    # Optional test id, the key failure items join on (see bucket_failures.py)
+    try:
+        cols["test_id"] = _pick(header, "test_id", "testid", "testnumber", "test_no")
     except KeyError:
-        first_use = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns, UTC]")
+        cols["test_id"] = None
+
+    # Optional test class/type, kept so readers can push filters down on them
+    for role, alts in (
+        ("test_class_id", ("test_class_id", "testclassid", "test_class")),
+        ("test_type", ("test_type", "testtype")),
+    ):
+        try:
+            cols[role] = _pick(header, *alts)
+        except KeyError:
+            cols[role] = None
+    return cols
+
+
+def _arrow_schema(cols: dict[str, str | None]) -> pa.Schema:
+    """Fixed output schema so every batch appends to the same partition files."""
+    ts = pa.timestamp("ns", tz="UTC")
+    fields = [
+        ("make", _DICT),
+        ("model", _DICT),
+        ("test_date", ts),
+        ("odometer", pa.int32()),
+        ("result", _DICT),
+        ("fuel_type", _DICT),
+        ("age_at_test", pa.int16()),
+    ]
+    if cols["first_use"] is not None:
+        fields.append(("first_use_date", ts))
+    if cols["test_id"] is not None:
+        fields.append(("test_id", pa.int64()))
+    for role in ("test_class_id", "test_type"):
+        if cols[role] is not None:
+            fields.append((role, _DICT))
+    return pa.schema(fields)
+
+
+def _narrow_int(s: pd.Series, dtype: str) -> pd.Series:
+    """Cast to a nullable narrow integer; values outside its range become NA."""
+    info = np.iinfo(dtype.lower())
+    return s.where(s.between(info.min, info.max)).astype(dtype)
+
+
+def _tidy_batch(df: pd.DataFrame, cols: dict[str, str | None], fuel_lookup: dict[str, str]) -> pd.DataFrame:
+    """Normalise one batch of raw CSV rows into the tidy results layout (plus test_year)."""
+    fuel_val = df[cols["fuel"]].astype(str).str.strip()
 
     # Build tidy frame
-    test_dt = _parse_date(df[date_col])
-    odometer = (
-        pd.to_numeric(df[mileage_col].str.replace(",", "", regex=False), errors="coerce")
-        .astype("Int64")
+    test_dt = _parse_date(df[cols["date"]])
+    odometer = _narrow_int(
+        pd.to_numeric(df[cols["mileage"]].str.replace(",", "", regex=False), errors="coerce"), "Int32"
     )
 
     # Normalise result to 'P' / 'F'
-    result_raw = df[result_col].astype(str).str.upper().str.strip()
+    result_raw = df[cols["result"]].astype(str).str.upper().str.strip()
     # Common variants
     result = (
         result_raw.replace(
@@ -174,13 +199,12 @@ def ingest_results() -> None:
     )
 
     # Map fuel codes if we can
-    fuel_lookup = _maybe_load_fuel_lookup()
     fuel_name = fuel_val.map(lambda x: fuel_lookup.get(str(x).strip(), str(x).strip()))
 
     tidy = pd.DataFrame(
         {
-            "make": df[make_col].astype(str).str.strip(),
-            "model": df[model_col].astype(str).str.strip(),
+            "make": df[cols["make"]].astype(str).str.strip(),
+            "model": df[cols["model"]].astype(str).str.strip(),
             "test_date": test_dt,
             "odometer": odometer,
             "result": result,
@@ -189,27 +213,105 @@ def ingest_results() -> None:
     )
 
     # Age at test (years, floored) if first_use available
-    if first_use.notna().any():
+    if cols["first_use"] is not None:
+        first_use = _parse_date(df[cols["first_use"]])
         age_years = ((test_dt - first_use).dt.days / 365.25).astype(float)
-        tidy["age_at_test"] = np.floor(age_years).astype("Int64")
+        tidy["age_at_test"] = _narrow_int(np.floor(age_years), "Int16")
         tidy["first_use_date"] = first_use
     else:
-        tidy["age_at_test"] = pd.Series(pd.NA, dtype="Int64")
+        tidy["age_at_test"] = pd.Series(pd.NA, index=tidy.index, dtype="Int16")
+
+    if cols["test_id"] is not None:
+        tidy["test_id"] = pd.to_numeric(df[cols["test_id"]], errors="coerce").astype("Int64")
+
+    for role in ("test_class_id", "test_type"):
+        if cols[role] is not None:
+            tidy[role] = df[cols[role]].str.strip()
 
     # Drop rows with no date or make/model
     tidy = tidy.dropna(subset=["test_date"]).reset_index(drop=True)
-
-    # Write a partitioned dataset (by year for convenience)
-    MOT_PARQUET.mkdir(parents=True, exist_ok=True)
     tidy["test_year"] = tidy["test_date"].dt.year.astype("Int64")
-    # Use pyarrow via pandas to_parquet (no engine arg needed with pyarrow installed)
+    return tidy
+
+
+def _ingest_csv(src: CsvSource, out_path: Path, fname: str, batch_rows: int, fuel_lookup: dict[str, str]) -> tuple[int, list[str]]:
+    """Stream one CSV into its own part file in each test_year= partition it touches.
+
+    Returns (rows written, part files relative to out_path).
+    """
+    print(f"[ingest_results] reading {src} in batches of {batch_rows:,} rows")
+
+    # Resolve columns from the header only; the body is streamed below.
+    with src.open() as f:
+        header = pd.read_csv(f, dtype=str, nrows=0)
+    header.columns = [c.strip() for c in header.columns]
+    cols = _resolve_columns(header)
+    schema = _arrow_schema(cols)
+
+    # One incremental writer per test_year= partition, so peak memory is bounded by
+    # batch_rows, not by the file size.
+    writers: dict[int, pq.ParquetWriter] = {}
+    rows = 0
+    try:
+        with src.open() as f:
+            for chunk in pd.read_csv(f, dtype=str, chunksize=batch_rows):
+                chunk.columns = [c.strip() for c in chunk.columns]
+                tidy = _tidy_batch(chunk, cols, fuel_lookup)
+                rows += len(tidy)
+                for year, g in tidy.groupby("test_year", dropna=True):
+                    year = int(year)
+                    if year not in writers:
+                        part = out_path / f"test_year={year}"
+                        part.mkdir(parents=True, exist_ok=True)
+                        writers[year] = pq.ParquetWriter(part / fname, schema)
+                    table = pa.Table.from_pandas(g.drop(columns=["test_year"]), schema=schema, preserve_index=False)
+                    writers[year].write_table(table)
+    finally:
+        for w in writers.values():
+            w.close()
+    return rows, [f"test_year={y}/{fname}" for y in sorted(writers)]
+
+
+def ingest_results(batch_rows: int = BATCH_ROWS, workers: int = WORKERS, full: bool = FULL_REBUILD) -> None:
+    src_root = RAW / "results"
+    if not src_root.exists():
+        raise FileNotFoundError("Expected data under data_raw/results (did you run the download step?)")
+
+    sources = {src.key(src_root): src for src in find_csvs_under(src_root)}
+    fuel_lookup = _maybe_load_fuel_lookup()
+
+    # Write a partitioned dataset (by year for convenience); every source CSV gets its own
+    # part file per partition. Only new/changed sources are re-parsed, so only the
+    # test_year= partitions they touch are rewritten.
     out_path = INT / "mot"  # alias of MOT_PARQUET root
-    # Partitioned write: we’ll write per-year files to keep things manageable
-    for year, g in tidy.groupby("test_year", dropna=True):
-        part = out_path / f"test_year={int(year)}"
-        part.mkdir(parents=True, exist_ok=True)
-        g.drop(columns=["test_year"]).to_parquet(part / "part.parquet", index=False)
-    print(f"[ingest_results] wrote Parquet -> {out_path} ({len(tidy):,} rows)")
+    MOT_PARQUET.mkdir(parents=True, exist_ok=True)
+    old = {} if full else load_manifest("ingest_results")
+    if any(e.get("schema") != SCHEMA_VERSION for e in old.values()):
+        old = {}  # parts written with an older schema can't share a dataset with new ones
+    if not old:
+        for part in out_path.glob("test_year=*/part*.parquet"):
+            part.unlink()
+    stale, fps = stale_sources(old, sources, out_path)
+    for key in set(old) - set(sources):
+        drop_outputs(old[key], out_path)
+    for key in stale:
+        drop_outputs(old.get(key), out_path)
+
+    jobs = [(sources[k], out_path, part_name(sources[k], src_root), batch_rows, fuel_lookup) for k in stale]
+    workers = max(1, min(workers, len(jobs)))
+    print(f"[ingest_results] {len(jobs)}/{len(sources)} CSV file(s) new or changed under {src_root}, {workers} worker(s)")
+    if workers == 1:
+        done = [_ingest_csv(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(_ingest_csv, *zip(*jobs)))
+
+    manifest = {k: {**fps[k], "schema": SCHEMA_VERSION, "outputs": old[k].get("outputs", [])} for k in sources if k not in stale}
+    for k, (_, outputs) in zip(stale, done):
+        manifest[k] = {**fps[k], "schema": SCHEMA_VERSION, "outputs": outputs}
+    save_manifest("ingest_results", manifest)
+    rows = sum(n for n, _ in done)
+    print(f"[ingest_results] wrote Parquet -> {out_path} ({rows:,} rows)")
 
 
 if __name__ == "__main__":
@@ -1,28 +1,41 @@
 # etl/join_publish.py
 from __future__ import annotations
 import os, json, sys, hashlib
+import multiprocessing as mp
 from pathlib import Path
 from typing import Dict, List
 import pandas as pd
 
 from .paths import MOT_AGG_PARQUET, RECALLS_PARQUET, VCA_PARQUET, PUB, VED_JSON, INT
-from .ved import load_ved_bands, ved_for_vehicle
+from .ved import load_ved_bands, ved_for_vehicles
+from .manifest import load_manifest, save_manifest
+from .precompress import FORMATS as PRECOMPRESS, needs_siblings, write_siblings, remove_siblings
+from .resolver import factorize_map
 try:
     import sys
     if hasattr(sys.stdout, "reconfigure"):
         sys.stdout.reconfigure(line_buffering=True)
 except Exception:
     pass
+# Publish worker processes (0 = one per CPU) and cohorts handed to a worker at a time
+WORKERS = int(os.environ.get("ETL_PUBLISH_WORKERS", "0") or 0) or (os.cpu_count() or 1)
+BATCH_SIZE = int(os.environ.get("ETL_PUBLISH_BATCH", "64") or 64)
+# Output layout: "files" (one JSON per cohort), "pack" (one bundle + offset index per make), or "both"
+PUBLISH_FORMAT = (os.environ.get("ETL_PUBLISH_FORMAT", "files") or "files").lower()
+PACK_DIR = "_packs"
 # --- norm/slug helpers ---
 try:
     from .resolver import norm as _norm, slug as _slug
 except Exception:
     import re, unicodedata
+    from functools import lru_cache
+    @lru_cache(maxsize=1 << 18)
     def _norm(s: str) -> str:
         s = "" if s is None else str(s)
         s = unicodedata.normalize("NFKD", s).encode("ascii","ignore").decode("ascii")
         s = re.sub(r"[^a-z0-9]+"," ", s.lower()).strip()
         return re.sub(r"\s+"," ", s)
+    @lru_cache(maxsize=1 << 18)
     def _slug(s: str) -> str:
         s = "" if s is None else str(s)
         s = unicodedata.normalize("NFKD", s).encode("ascii","ignore").decode("ascii")
@@ -47,8 +60,8 @@ def _failure_share_lookup() -> Dict[tuple, Dict[str,float]]:
     need = {"make","model","firstRegYear","category","share"}
     if not need.issubset(df.columns): return {}
     df = df.copy()
-    df["norm_make"] = df["make"].map(_norm)
-    df["norm_model"] = df["model"].map(_norm)
+    df["norm_make"] = factorize_map(df["make"], _norm)
+    df["norm_model"] = factorize_map(df["model"], _norm)
     m: Dict[tuple, Dict[str,float]] = {}
     for r in df.itertuples(index=False):
         key = (r.norm_make, r.norm_model, int(r.firstRegYear))
@@ -60,22 +73,37 @@ def _top_buckets(share_map: Dict[str,float]) -> List[dict]:
     items = sorted(share_map.items(), key=lambda kv: kv[1], reverse=True)[:5]
     return [{"bucket": k, "share": _compact_float(v, 3)} for k,v in items if v and v>0]
 
-def _recall_timeline(rec: pd.DataFrame | None, mk_norm: str, md_norm: str) -> list[dict]:
-    if rec is None or rec.empty: return []
+def _recall_index(rec: pd.DataFrame | None) -> Dict[tuple, list[dict]]:
+    """Recall timelines for every (norm_make, norm_model), built in one pass."""
+    if rec is None or rec.empty: return {}
     c = {x.lower(): x for x in rec.columns}
     mk = c.get("norm_make") or c.get("make"); md = c.get("norm_model") or c.get("model")
     yr = c.get("year") or c.get("recall_year"); cnt = c.get("recalls") or c.get("count")
-    if not mk or not md or not yr: return []
-    sub = rec[(rec[mk].map(_norm)==mk_norm) & (rec[md].map(_norm)==md_norm)]
-    if sub.empty: return []
-    if cnt not in sub.columns:
-        sub = sub.assign(_one=1); cnt = "_one"
-    g = sub.groupby(yr, dropna=True)[cnt].sum().reset_index().sort_values(yr)
-    return [{"year": int(r[yr]), "count": int(r[cnt])} for _,r in g.iterrows()]
-
-def _vca_panel(vca: pd.DataFrame | None, mk_norm: str, md_norm: str, first_year: int, ved_bands: dict) -> list[dict]:
-    if vca is None or vca.empty: return []
-    df = vca.copy(); df.columns = [c.lower() for c in df.columns]
+    if not mk or not md or not yr: return {}
+    df = pd.DataFrame({
+        "mk": factorize_map(rec[mk], _norm),
+        "md": factorize_map(rec[md], _norm),
+        "yr": rec[yr],
+        "cnt": rec[cnt] if cnt in rec.columns else 1,
+    })
+    g = df.groupby(["mk","md","yr"], dropna=True, observed=True)["cnt"].sum().reset_index()
+    out: Dict[tuple, list[dict]] = {}
+    for r in g.itertuples(index=False):
+        out.setdefault((r.mk, r.md), []).append({"year": int(r.yr), "count": int(r.cnt)})
+    return out
+
+def _cohort_slices(mot: pd.DataFrame) -> Dict[tuple, tuple[int, int]]:
+    """(norm_make, norm_model, firstRegYear) -> [start, stop) row range in a cohort-sorted frame."""
+    idx = mot.groupby(["norm_make","norm_model","firstRegYear"], sort=False, dropna=True, observed=True).indices
+    return {k: (int(v[0]), int(v[-1]) + 1) for k, v in idx.items()}
+
+def _vca_index(vca: pd.DataFrame | None, ved_bands: dict) -> Dict[tuple, list[dict]]:
+    """co2 panels keyed by (norm_make, norm_model, first_use_year), VED already attached.
+
+    Built once per run so each cohort is a single dict lookup.
+    """
+    if vca is None or vca.empty: return {}
+    df = vca.rename(columns=str.lower)
     mk = "norm_make" if "norm_make" in df.columns else "make"
     md = "norm_model" if "norm_model" in df.columns else "model"
     yr = "first_use_year" if "first_use_year" in df.columns else ("firstregyear" if "firstregyear" in df.columns else None)
@@ -83,13 +111,16 @@ def _vca_panel(vca: pd.DataFrame | None, mk_norm: str, md_norm: str, first_year:
     co2 = "co2_gkm" if "co2_gkm" in df.columns else ("co2" if "co2" in df.columns else None)
     mpg = "mpg_combined" if "mpg_combined" in df.columns else ("mpg" if "mpg" in df.columns else None)
     test = "test_type" if "test_type" in df.columns else ("cycle" if "cycle" in df.columns else None)
-    if not yr or not fuel or not co2: return []
-    sub = df[(df[mk].map(_norm)==mk_norm) & (df[md].map(_norm)==md_norm) & (df[yr].astype("Int64")==int(first_year))]
-    if sub.empty: return []
-    panels=[]
-    for _,r in sub.iterrows():
-        ved = ved_for_vehicle(ved_bands, r[co2], int(first_year), str(r[fuel]))
-        panels.append({
+    if not yr or not fuel or not co2: return {}
+    years = df[yr].astype("Int64")
+    df = df[years.notna().to_numpy()]
+    years = years.dropna().astype(int)
+    keys = zip(factorize_map(df[mk], _norm), factorize_map(df[md], _norm), years)
+    # VED for the whole table in one vectorised lookup
+    veds = ved_for_vehicles(ved_bands, df[co2], years.to_numpy(), df[fuel].astype(str)).to_dict("records")
+    index: Dict[tuple, list[dict]] = {}
+    for key, r, ved in zip(keys, df.to_dict("records"), veds):
+        index.setdefault(key, []).append({
             "fuel": str(r[fuel]),
             "co2_gkm": _compact_float(r[co2], 0),
             "mpg": _compact_float(r[mpg], 0) if mpg and mpg in r else None,
@@ -99,14 +130,197 @@ def _vca_panel(vca: pd.DataFrame | None, mk_norm: str, md_norm: str, first_year:
             "ved_first_year": ved.get("first_year"),
             "ved_supplement": ved.get("supplement"),
         })
-    return panels
+    return index
 
 def _cohort_hash(mk_norm: str, md_norm: str) -> int:
     # Stable small int hash for sharding
     h = hashlib.sha1(f"{mk_norm}::{md_norm}".encode("utf-8")).hexdigest()
     return int(h[:8], 16)
 
-def build_and_publish() -> int:
+# Loaded tables shared with forked publish workers (set by build_and_publish)
+_CTX: dict = {}
+
+def _safe_slug(val: str, fallback: str) -> str:
+    s = _slug(val or "")
+    if not s:
+        s = _slug(_norm(val or "")) or fallback
+    return s
+
+def _cohort_slugs(r: tuple) -> tuple[str, str]:
+    make, model, _, _, mk_slug, md_slug, _ = r
+    # guard slugs (some odd strings can end up empty)
+    return (mk_slug if mk_slug else _safe_slug(make, "make"),
+            md_slug if md_slug else _safe_slug(model, "model"))
+
+def _cohort_rel(r: tuple) -> str | None:
+    """Output path (relative to PUB) a cohort row publishes to, None without a year."""
+    mk_slug, md_slug = _cohort_slugs(r)
+    return f"{mk_slug}/{md_slug}/{int(r[6])}.json" if pd.notna(r[6]) else None
+
+def _one_per_path(cohorts: pd.DataFrame) -> pd.DataFrame:
+    """Drop cohorts whose output path a later cohort also publishes to.
+
+    Raw spellings that slug alike ("FORD"/"Ford") share a document; the last one in
+    cohort order is kept, as when they were written one after another.
+    """
+    rels = pd.Series([_cohort_rel(r) for r in cohorts.itertuples(index=False, name=None)], dtype=object)
+    dup = rels.duplicated(keep="last") & rels.notna()
+    if dup.any():
+        print(f"[join_publish] {int(dup.sum())} cohort(s) share an output path with a later cohort; keeping the last")
+    return cohorts[~dup.to_numpy()]
+
+def _publish_cohort(r: tuple) -> tuple[str, bytes]:
+    """Build one cohort document; returns (path relative to PUB, serialised JSON)."""
+    mot, slices, fail = _CTX["mot"], _CTX["slices"], _CTX["fail"]
+    make, model, mk_norm, md_norm, _, _, year = r
+    mk_slug, md_slug = _cohort_slugs(r)
+
+    year = int(year) if pd.notna(year) else None
+    if year is None:
+        raise ValueError("missing year")
+
+    # rows for this cohort
+    span = slices.get((mk_norm, md_norm, year))
+    if span is None:
+        raise ValueError("empty cohort slice")
+    msub = mot.iloc[span[0]:span[1]]
+
+    fail_top = _top_buckets(fail.get((mk_norm, md_norm, int(year)), {}))
+
+    curve = []
+    for rr in msub.itertuples(index=False):
+        curve.append({
+            "age": int(rr.age_at_test) if pd.notna(rr.age_at_test) else None,
+            "tests": None,
+            "pass_rate": _compact_float(rr.pass_rate, 3),
+            "mileage": {
+                "p50": _compact_float(getattr(rr, "p50", None), 0),
+                "p75": _compact_float(getattr(rr, "p75", None), 0),
+                "p90": _compact_float(getattr(rr, "p90", None), 0),
+            },
+            "fail_mix": fail_top,
+        })
+
+    co2_panel = _CTX["vca"].get((mk_norm, md_norm, int(year)), [])
+    recalls   = _CTX["rec"].get((mk_norm, md_norm), [])
+
+    doc = {
+        "make": make,
+        "model": model,
+        "make_slug": mk_slug,
+        "model_slug": md_slug,
+        "first_reg_year": int(year),
+        "fuels": sorted({(p.get("fuel") or "").lower() for p in co2_panel if p.get("fuel")}) if co2_panel else [],
+        "co2_panel": co2_panel,
+        "recalls": recalls,
+        "mot_curve": curve,
+        "meta": {
+            "source": "DVSA anonymised MOT results & failure items (OGL v3.0); DVSA Recalls; VCA CO₂/MPG; GOV.UK VED",
+            "version": "weekly",
+        },
+    }
+
+    rel = f"{mk_slug}/{md_slug}/{int(year)}.json"
+    return rel, json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _write_if_changed(rel: str, data: bytes) -> tuple[str, bool]:
+    """Write PUB/rel unless the last run (or the file on disk) already has these bytes.
+
+    The manifest digest is only trusted while the file on disk still has the size it
+    implies, so a file edited or truncated behind the manifest's back is rewritten.
+    """
+    digest = hashlib.sha1(data).hexdigest()
+    out_path = PUB / rel
+    prev = _CTX["manifest"].get(rel, {}).get("sha1")
+    if out_path.exists() and (
+        (prev == digest and out_path.stat().st_size == len(data))
+        or (prev is None and out_path.read_bytes() == data)
+    ):
+        return digest, False
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_bytes(data)
+    return digest, True
+
+def _write_pack(pack_dir: Path, make_slug: str, docs: Dict[str, bytes], merge: bool) -> bool:
+    """Write <make>.pack (newline-separated cohort JSON) and <make>.idx.json.
+
+    The index maps "model_slug/year" to [offset, length] in the pack, so a reader needs a
+    single ranged read per cohort. With merge=True, cohorts already in the pack and not
+    republished this run are carried over. Returns True if either file changed.
+
+    Each file is written to a temporary name and swapped in with os.replace, the pack before
+    its index, so a reader never sees a half-written file.
+    """
+    pack_path = pack_dir / f"{make_slug}.pack"
+    idx_path = pack_dir / f"{make_slug}.idx.json"
+    if merge and idx_path.exists() and pack_path.exists():
+        blob = pack_path.read_bytes()
+        for key, (off, ln) in json.loads(idx_path.read_text(encoding="utf-8"))["cohorts"].items():
+            docs.setdefault(key, blob[off:off + ln])
+    buf = bytearray()
+    index = {}
+    for key in sorted(docs):
+        index[key] = [len(buf), len(docs[key])]
+        buf += docs[key] + b"\n"
+    idx = json.dumps({"pack": pack_path.name, "cohorts": index}, separators=(",", ":")).encode("utf-8")
+    changed = False
+    pack_dir.mkdir(parents=True, exist_ok=True)
+    for path, data in ((pack_path, bytes(buf)), (idx_path, idx)):
+        if not path.exists() or path.read_bytes() != data:
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            changed = True
+    return changed
+
+def read_packed_cohort(make_slug: str, model_slug: str, year: int, root: Path | None = None) -> dict | None:
+    """Fetch one cohort document from a make pack with a single seek + read."""
+    pack_dir = Path(root or PUB) / PACK_DIR
+    idx_path = pack_dir / f"{make_slug}.idx.json"
+    if not idx_path.exists():
+        return None
+    idx = json.loads(idx_path.read_text(encoding="utf-8"))
+    span = idx["cohorts"].get(f"{model_slug}/{int(year)}")
+    if span is None:
+        return None
+    with open(pack_dir / idx["pack"], "rb") as f:
+        f.seek(span[0])
+        return json.loads(f.read(span[1]))
+
+def _publish_batch(batch: list[tuple[int, tuple]]) -> tuple[int, int, list[tuple]]:
+    """Publish a batch of (position, cohort row).
+
+    Returns (processed, skipped, [(path, sha1, changed, bytes-if-packing)] per published cohort).
+    """
+    shard_idx, shard_cnt = _CTX["shard"]
+    skipped = 0
+    entries = []
+    for i, r in batch:
+        try:
+            rel, data = _publish_cohort(r)
+            if _CTX["files"]:
+                digest, is_new = _write_if_changed(rel, data)
+                # Compress here so it runs on the publish workers; unchanged documents keep their siblings
+                if PRECOMPRESS and (is_new or needs_siblings(PUB / rel, PRECOMPRESS)):
+                    write_siblings(PUB / rel, data, PRECOMPRESS)
+                if is_new:
+                    # siblings in formats no longer generated would serve the old bytes
+                    remove_siblings(PUB / rel, keep=PRECOMPRESS)
+            else:
+                digest = hashlib.sha1(data).hexdigest()
+                is_new = _CTX["manifest"].get(rel, {}).get("sha1") != digest
+            entries.append((rel, digest, is_new, data if _CTX["pack"] else None))
+        except Exception as e:
+            skipped += 1
+            # log enough to find the offender next time
+            try:
+                print(f"[WARN] skipped cohort #{i} shard {shard_idx+1}/{shard_cnt} "
+                      f"({r[2]}/{r[3]}/{int(r[6]) if pd.notna(r[6]) else 'NA'}): {e}")
+            except Exception:
+                print(f"[WARN] skipped cohort #{i} shard {shard_idx+1}/{shard_cnt}: {e}")
+    return len(batch), skipped, entries
+
+def build_and_publish(workers: int = WORKERS, batch_size: int = BATCH_SIZE) -> int:
     sys.stdout.reconfigure(line_buffering=True)  # flush prints immediately
 
     print("Reading Parquet…")
@@ -117,14 +331,17 @@ def build_and_publish() -> int:
         raise KeyError(f"Aggregate parquet missing columns: {missing}")
 
     mot = mot.copy()
-    mot["norm_make"]  = mot["make"].map(_norm)
-    mot["norm_model"] = mot["model"].map(_norm)
-    mot["make_slug"]  = mot["make"].map(_slug)
-    mot["model_slug"] = mot["model"].map(_slug)
-
-    rec  = _read_opt(RECALLS_PARQUET)
-    vca  = _read_opt(VCA_PARQUET)
+    mot["norm_make"]  = factorize_map(mot["make"], _norm)
+    mot["norm_model"] = factorize_map(mot["model"], _norm)
+    mot["make_slug"]  = factorize_map(mot["make"], _slug)
+    mot["model_slug"] = factorize_map(mot["model"], _slug)
+    # Sort once so each cohort is a contiguous run of rows, ordered by age
+    mot = mot.sort_values(["norm_make","norm_model","firstRegYear","age_at_test"], kind="stable").reset_index(drop=True)
+    slices = _cohort_slices(mot)
+
+    rec  = _recall_index(_read_opt(RECALLS_PARQUET))
     ved  = load_ved_bands(str(VED_JSON)) if Path(VED_JSON).exists() else {"eras":{}}
+    vca  = _vca_index(_read_opt(VCA_PARQUET), ved)
     fail = _failure_share_lookup()
 
     # Filters / caps
@@ -137,6 +354,12 @@ def build_and_publish() -> int:
     shard_cnt = int(os.environ.get("ETL_SHARDS", "1") or 1)
     y_min = int(y_min) if y_min else None
     y_max = int(y_max) if y_max else None
+    # Shards split a make's models between them, so no shard can own that make's pack
+    publish_format = PUBLISH_FORMAT
+    if shard_cnt > 1 and publish_format in ("pack", "both"):
+        print(f"[WARN] ETL_PUBLISH_FORMAT={publish_format} needs an unsharded run; "
+              f"shard {shard_idx+1}/{shard_cnt} publishes cohort files only")
+        publish_format = "files"
 
     cohorts = (
         mot[["make","model","norm_make","norm_model","make_slug","model_slug","firstRegYear"]]
@@ -152,6 +375,9 @@ def build_and_publish() -> int:
     if y_max is not None:
         cohorts = cohorts[cohorts["firstRegYear"] <= y_max]
 
+    # One document per output path, before sharding so no two shards or workers race on a file
+    cohorts = _one_per_path(cohorts)
+
     # Shard by (make, model)
     if shard_cnt > 1:
         mask = [
@@ -164,93 +390,93 @@ def build_and_publish() -> int:
         cohorts = cohorts.head(cap)
 
     total = len(cohorts)
-    print(f"Cohorts to publish in this shard: {total} (shard {shard_idx+1}/{shard_cnt})")
-
-    def safe_slug(val: str, fallback: str) -> str:
-        s = _slug(val or "")
-        if not s:
-            s = _slug(_norm(val or "")) or fallback
-        return s
+    workers = max(1, min(workers, total))
+    print(f"Cohorts to publish in this shard: {total} (shard {shard_idx+1}/{shard_cnt}, {workers} worker(s))")
+
+    # Content-hash manifest from the previous run of this shard; unchanged documents are not
+    # rewritten. On a first unsharded run, seed it from what is already on disk.
+    manifest_name = "publish" if shard_cnt == 1 else f"publish.shard{shard_idx}of{shard_cnt}"
+    complete = not (cap or f_make or f_model or y_min is not None or y_max is not None)
+    old = load_manifest(manifest_name)
+    if not old and complete and shard_cnt == 1:
+        old = {p.relative_to(PUB).as_posix(): {} for p in PUB.glob("*/*/*.json")}
+
+    # Workers inherit the loaded tables read-only through fork; cohorts are handed out in
+    # small batches on demand so a few huge makes can't leave other workers idle.
+    _CTX.update(mot=mot, slices=slices, rec=rec, vca=vca, fail=fail, shard=(shard_idx, shard_cnt), manifest=old,
+                files=publish_format in ("files", "both"), pack=publish_format in ("pack", "both"))
+    rows = list(enumerate(cohorts.itertuples(index=False, name=None), start=1))
+    batches = [rows[k:k + batch_size] for k in range(0, len(rows), batch_size)]
 
     out_count = 0
     skipped = 0
-
-    for i, r in enumerate(cohorts.itertuples(index=False), start=1):
-        try:
-            make, model, mk_norm, md_norm, mk_slug, md_slug, year = r
-            # guard slugs (some odd strings can end up empty)
-            mk_slug = mk_slug if mk_slug else safe_slug(make, "make")
-            md_slug = md_slug if md_slug else safe_slug(model, "model")
-
-            year = int(year) if pd.notna(year) else None
-            if year is None:
-                raise ValueError("missing year")
-
-            # rows for this cohort
-            msub = mot[
-                (mot["norm_make"] == mk_norm)
-                & (mot["norm_model"] == md_norm)
-                & (mot["firstRegYear"] == year)
-            ].sort_values("age_at_test")
-
-            if msub.empty:
-                raise ValueError("empty cohort slice")
-
-            fail_top = _top_buckets(fail.get((mk_norm, md_norm, int(year)), {}))
-
-            curve = []
-            for rr in msub.itertuples(index=False):
-                curve.append({
-                    "age": int(rr.age_at_test) if pd.notna(rr.age_at_test) else None,
-                    "tests": None,
-                    "pass_rate": _compact_float(rr.pass_rate, 3),
-                    "mileage": {
-                        "p50": _compact_float(getattr(rr, "p50", None), 0),
-                        "p75": _compact_float(getattr(rr, "p75", None), 0),
-                        "p90": _compact_float(getattr(rr, "p90", None), 0),
-                    },
-                    "fail_mix": fail_top,
-                })
-
-            co2_panel = _vca_panel(vca, mk_norm, md_norm, int(year), ved)
-            recalls   = _recall_timeline(rec, mk_norm, md_norm)
-
-            doc = {
-                "make": make,
-                "model": model,
-                "make_slug": mk_slug,
-                "model_slug": md_slug,
-                "first_reg_year": int(year),
-                "fuels": sorted({(p.get("fuel") or "").lower() for p in co2_panel if p.get("fuel")}) if co2_panel else [],
-                "co2_panel": co2_panel,
-                "recalls": recalls,
-                "mot_curve": curve,
-                "meta": {
-                    "source": "DVSA anonymised MOT results & failure items (OGL v3.0); DVSA Recalls; VCA CO₂/MPG; GOV.UK VED",
-                    "version": "weekly",
-                },
-            }
-
-            out_dir = PUB / mk_slug / md_slug
-            out_dir.mkdir(parents=True, exist_ok=True)
-            out_path = out_dir / f"{int(year)}.json"
-            with open(out_path, "w", encoding="utf-8") as f:
-                json.dump(doc, f, ensure_ascii=False, separators=(",", ":"))
-
-            out_count += 1
-            if i % 200 == 0 or i == total:
-                print(f"...{i}/{total} cohorts processed (written={out_count}, skipped={skipped}) in shard {shard_idx+1}/{shard_cnt}")
-
-        except Exception as e:
-            skipped += 1
-            # log enough to find the offender next time
-            try:
-                print(f"[WARN] skipped cohort #{i} shard {shard_idx+1}/{shard_cnt} "
-                      f"({r.norm_make}/{r.norm_model}/{int(r.firstRegYear) if pd.notna(r.firstRegYear) else 'NA'}): {e}")
-            except Exception:
-                print(f"[WARN] skipped cohort #{i} shard {shard_idx+1}/{shard_cnt}: {e}")
-
-    print(f"Published {out_count} cohort JSON files to {PUB} (skipped={skipped})")
+    done = 0
+    published: Dict[str, dict] = {}
+    changed: List[str] = []
+    packs: Dict[str, Dict[str, bytes]] = {}
+    if workers > 1 and "fork" not in mp.get_all_start_methods():
+        print("[WARN] fork start method unavailable; publishing in-process")
+        workers = 1
+    pool = None
+    try:
+        if workers > 1:
+            pool = mp.get_context("fork").Pool(workers)
+        results = map(_publish_batch, batches) if pool is None else pool.imap_unordered(_publish_batch, batches)
+        for n, skip, entries in results:
+            out_count += len(entries)
+            skipped += skip
+            for rel, digest, is_new, data in entries:
+                published[rel] = {"sha1": digest}
+                if is_new:
+                    changed.append(rel)
+                if data is not None:
+                    mk_slug, key = rel[:-len(".json")].split("/", 1)
+                    packs.setdefault(mk_slug, {})[key] = data
+            if (done + n) // 200 > done // 200 or done + n == total:
+                print(f"...{done + n}/{total} cohorts processed (written={out_count}, skipped={skipped}) in shard {shard_idx+1}/{shard_cnt}")
+            done += n
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        write_files = _CTX.get("files", True)
+        _CTX.clear()
+
+    # Cohorts that disappeared since the last complete run are removed. Partial runs
+    # (filters, caps, or cohorts skipped on error) keep the rest of the previous manifest.
+    deleted: List[str] = []
+    if complete and not skipped:
+        for rel in sorted(set(old) - set(published)):
+            if not write_files:
+                continue
+            (PUB / rel).unlink(missing_ok=True)
+            remove_siblings(PUB / rel)
+            deleted.append(rel)
+            for d in ((PUB / rel).parent, (PUB / rel).parent.parent):
+                if d != PUB and d.exists() and not any(d.iterdir()):
+                    d.rmdir()
+    else:
+        published = {**old, **published}
+    save_manifest(manifest_name, {k: v for k, v in published.items() if v})
+
+    # Packed output: one bundle per make. Partial runs merge into existing packs.
+    full_set = complete and not skipped
+    pack_dir = PUB / PACK_DIR
+    for mk_slug, docs in sorted(packs.items()):
+        if _write_pack(pack_dir, mk_slug, docs, merge=not full_set):
+            changed += [f"{PACK_DIR}/{mk_slug}.pack", f"{PACK_DIR}/{mk_slug}.idx.json"]
+    if packs and full_set:
+        for idx_path in sorted(pack_dir.glob("*.idx.json")):
+            mk_slug = idx_path.name[:-len(".idx.json")]
+            if mk_slug not in packs:
+                for p in (idx_path, pack_dir / f"{mk_slug}.pack"):
+                    p.unlink(missing_ok=True)
+                    deleted.append(f"{PACK_DIR}/{p.name}")
+
+    changed_path = INT / f"{manifest_name}_changed.txt"
+    changed_path.write_text("".join(f"{rel}\n" for rel in sorted(changed) + deleted), encoding="utf-8")
+    print(f"Published {out_count} cohort JSON files to {PUB} (changed={len(changed)}, deleted={len(deleted)}, "
+          f"skipped={skipped}); changed paths -> {changed_path}")
     return out_count
 
 if __name__ == "__main__":
@@ -1,8 +1,17 @@
 from __future__ import annotations
+import json
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from typing import Dict, Optional
 
+from .paths import INT
+from .manifest import fingerprint
+
+# Parsed lookup maps, reused until a CSV under the lookup dir changes
+LOOKUP_CACHE = INT / "lookups_cache.json"
+_CACHE_VERSION = 1
+
 def _read_any_csv(root: Path, names_like: tuple[str, ...]) -> Optional[pd.DataFrame]:
     if not root.exists():
         return None
@@ -25,36 +34,40 @@ def load_lookup_tables(lookup_dir: Path) -> dict:
     if rfr is not None:  lookups["rfr"] = rfr
     return lookups
 
-def build_result_map(df: pd.DataFrame) -> Dict[str, str]:
-    if df is None or df.empty: return {}
+def _code_label(df: pd.DataFrame) -> Optional[tuple[pd.Series, pd.Series]]:
+    """Stripped code and raw label columns (label falls back to the code)."""
     code_col = next((c for c in df.columns if "code" in c.lower()), None)
     txt_col  = next((c for c in df.columns if any(k in c.lower() for k in ("desc","text","name"))), None)
-    out = {}
-    for _, r in df.iterrows():
-        code = str(r.get(code_col, "")).strip()
-        label = str(r.get(txt_col, code)).strip().upper()
-        if not code: continue
-        if label.startswith("PASS"): out[code] = "PASS"
-        elif label.startswith("FAIL"): out[code] = "FAIL"
-        elif "PRS" in label or "PASS AFTER" in label: out[code] = "PRS"
-        else: out[code] = label
-    return out
+    if code_col is None:
+        return None
+    code = df[code_col].astype(str).str.strip()
+    label = df[txt_col].astype(str) if txt_col is not None else code
+    keep = code != ""
+    return code[keep], label[keep].str.strip()
+
+def build_result_map(df: pd.DataFrame) -> Dict[str, str]:
+    if df is None or df.empty: return {}
+    cl = _code_label(df)
+    if cl is None: return {}
+    code, label = cl[0], cl[1].str.upper()
+    out = np.select(
+        [label.str.startswith("PASS"), label.str.startswith("FAIL"),
+         label.str.contains("PRS", regex=False) | label.str.contains("PASS AFTER", regex=False)],
+        ["PASS", "FAIL", "PRS"], default=label.to_numpy(dtype=object),
+    )
+    return dict(zip(code, out))
 
 def build_fuel_map(df: pd.DataFrame) -> Dict[str, str]:
     if df is None or df.empty: return {}
-    code_col = next((c for c in df.columns if "code" in c.lower()), None)
-    txt_col  = next((c for c in df.columns if any(k in c.lower() for k in ("desc","text","name"))), None)
-    out = {}
-    for _, r in df.iterrows():
-        code = str(r.get(code_col, "")).strip()
-        label = str(r.get(txt_col, code)).strip().lower()
-        if not code: continue
-        if label.startswith("petrol") or label == "pe": label = "petrol"
-        elif label.startswith("diesel") or label == "di": label = "diesel"
-        elif "hybrid" in label: label = "hybrid"
-        elif "electric" in label or label == "ev": label = "electric"
-        out[code] = label
-    return out
+    cl = _code_label(df)
+    if cl is None: return {}
+    code, label = cl[0], cl[1].str.lower()
+    out = np.select(
+        [label.str.startswith("petrol") | (label == "pe"), label.str.startswith("diesel") | (label == "di"),
+         label.str.contains("hybrid", regex=False), label.str.contains("electric", regex=False) | (label == "ev")],
+        ["petrol", "diesel", "hybrid", "electric"], default=label.to_numpy(dtype=object),
+    )
+    return dict(zip(code, out))
 
 FAIL_BUCKETS = {
     "1": "brakes",
@@ -80,11 +93,85 @@ def build_rfr_bucket_map(rfr_lookup: pd.DataFrame) -> Dict[str, str]:
     if rfr_lookup is None or rfr_lookup.empty:
         return {}
     key_col = next((c for c in rfr_lookup.columns if c.lower() in ("code","rfrcode","rfr_code","item_id","rfr_id","defect_id")), None)
+    if key_col is None:
+        return {}
+    key = rfr_lookup[key_col].astype(str).str.strip()
+    # Same rule as rfr_section_from_lookup_row: first section/item column holding "n.n"
+    section = pd.Series("", index=rfr_lookup.index)
+    for c in reversed([c for c in rfr_lookup.columns if "section" in c.lower() or "item" in c.lower()]):
+        val = rfr_lookup[c].astype(str)
+        hit = val.str.contains(r"\d", regex=True) & val.str.contains(".", regex=False)
+        section = val.where(hit, section)
+    head = section.str.split(".", n=1).str[0].str.strip()
+    bucket = head.map(FAIL_BUCKETS).fillna("other")
+    keep = key != ""
+    return dict(zip(key[keep], bucket[keep]))
+
+def _sniff_fuel_codes(lookup_dir: Path) -> Dict[str, str]:
+    """Fuel code -> name from any CSV that looks like a fuel lookup (ingest_results' view)."""
     out: Dict[str, str] = {}
-    for _, r in rfr_lookup.iterrows():
-        key = str(r.get(key_col, "")).strip()
-        if not key: continue
-        section = rfr_section_from_lookup_row(r)
-        head = section.split(".", 1)[0].strip()
-        out[key] = FAIL_BUCKETS.get(head, "other")
+    for p in sorted(lookup_dir.rglob("*.csv")):
+        try:
+            df = pd.read_csv(p, dtype=str, low_memory=False).rename(columns=str.lower)
+        except Exception:
+            continue
+        # Accept any frame that looks like: ['fuel_type_code', 'fuel_type'] or similar
+        candidates = [
+            ("fuel_type_code", "fuel_type"),
+            ("fuelcode", "fueltype"),
+            ("code", "fuel_type"),
+            ("fuel_type_code", "description"),
+            ("code", "description"),
+        ]
+        for code_col, name_col in candidates:
+            if code_col in df.columns and name_col in df.columns:
+                pairs = df[[code_col, name_col]].dropna().drop_duplicates()
+                mapping = dict(zip(pairs[code_col], pairs[name_col]))
+                # Keep first mapping we find; later files won't override existing keys
+                for k, v in mapping.items():
+                    out.setdefault(str(k).strip(), str(v).strip())
+                break
+    # Add tiny safety net for the common 2024 short codes
+    out.setdefault("PE", "Petrol")
+    out.setdefault("DI", "Diesel")
+    out.setdefault("EL", "Electric")
+    out.setdefault("HE", "Hybrid")
     return out
+
+def _build_maps(lookup_dir: Path) -> Dict[str, Dict[str, str]]:
+    look = load_lookup_tables(lookup_dir)
+    return {
+        "fuel_codes": _sniff_fuel_codes(lookup_dir),
+        "fuel": build_fuel_map(look.get("fuel")),
+        "result": build_result_map(look.get("result")),
+        "rfr_bucket": build_rfr_bucket_map(look.get("rfr")),
+    }
+
+def cached_lookups(lookup_dir: Path, cache_path: Path | None = None) -> Dict[str, Dict[str, str]]:
+    """All lookup maps for `lookup_dir`: fuel_codes, fuel, result, rfr_bucket.
+
+    Parsed once and stored as JSON keyed by the fingerprint of every CSV in the
+    directory; later calls (and later stages) just read the JSON back.
+    """
+    empty = {"fuel_codes": {}, "fuel": {}, "result": {}, "rfr_bucket": {}}
+    lookup_dir = Path(lookup_dir)
+    if not lookup_dir.exists():
+        return empty
+    cache_path = Path(cache_path or LOOKUP_CACHE)
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+    except Exception:
+        cached = {}
+    prev = cached.get("sources", {}) if cached.get("version") == _CACHE_VERSION else {}
+    sources = {p.relative_to(lookup_dir).as_posix(): fingerprint(p, prev.get(p.relative_to(lookup_dir).as_posix()))
+               for p in sorted(lookup_dir.rglob("*.csv"))}
+    if prev and {k: v["sha1"] for k, v in prev.items()} == {k: v["sha1"] for k, v in sources.items()}:
+        return {**empty, **cached.get("maps", {})}
+
+    maps = _build_maps(lookup_dir)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps({"version": _CACHE_VERSION, "sources": sources, "maps": maps}), encoding="utf-8")
+    tmp.replace(cache_path)
+    print(f"[lookups] parsed {len(sources)} lookup CSV(s) -> {cache_path}")
+    return maps
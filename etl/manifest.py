@@ -0,0 +1,88 @@
+# etl/manifest.py
+"""
+Source-file manifests for incremental ingest.
+
+Each stage keeps INT/manifests/<stage>.json mapping a source key (usually the
+path relative to the raw folder) to its fingerprint and the output files it
+produced:
+
+  {"size": 123, "mtime_ns": 169..., "sha1": "ab12...", "outputs": ["test_year=2023/part-....parquet"]}
+
+Size + mtime are a cheap pre-check; the content hash is only recomputed when
+either of them moved, and a touched-but-identical file is still treated as unchanged.
+Sources that know their own checksum (zip members, see sources.py) record a "crc32"
+instead of a "sha1".
+"""
+
+from __future__ import annotations
+from pathlib import Path
+import hashlib
+import json
+import os
+
+from .paths import INT
+
+MANIFEST_DIR = INT / "manifests"
+FULL_REBUILD = os.environ.get("ETL_FULL_REBUILD", "") not in ("", "0")
+
+def source_key(name: str) -> str:
+    """Short stable id for a source, used in output part-file names."""
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()[:12]
+
+def _sha1_file(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            b = f.read(chunk)
+            if not b:
+                break
+            h.update(b)
+    return h.hexdigest()
+
+def fingerprint(path: Path, prev: dict | None = None) -> dict:
+    st = Path(path).stat()
+    if prev and prev.get("size") == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns and prev.get("sha1"):
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": prev["sha1"]}
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": _sha1_file(Path(path))}
+
+def _content_id(fp: dict | None) -> str | None:
+    return (fp or {}).get("sha1") or (fp or {}).get("crc32")
+
+def load_manifest(name: str) -> dict[str, dict]:
+    p = MANIFEST_DIR / f"{name}.json"
+    if not p.exists():
+        return {}
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+def save_manifest(name: str, entries: dict[str, dict]) -> None:
+    MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+    p = MANIFEST_DIR / f"{name}.json"
+    tmp = p.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(entries, indent=1, sort_keys=True), encoding="utf-8")
+    tmp.replace(p)
+
+def stale_sources(old: dict[str, dict], sources: dict, out_root: Path) -> tuple[list[str], dict[str, dict]]:
+    """Return (keys that need re-ingesting, fresh fingerprints for every source).
+
+    A source is stale if it is new, its content hash changed, or any output it
+    produced last time has gone missing.
+    """
+    stale: list[str] = []
+    fps: dict[str, dict] = {}
+    for key, path in sources.items():
+        prev = old.get(key)
+        fps[key] = path.fingerprint(prev) if hasattr(path, "fingerprint") else fingerprint(path, prev)
+        if (
+            prev is None
+            or _content_id(prev) != _content_id(fps[key])
+            or any(not (out_root / o).exists() for o in prev.get("outputs", []))
+        ):
+            stale.append(key)
+    return stale, fps
+
+def drop_outputs(entry: dict | None, out_root: Path) -> None:
+    for o in (entry or {}).get("outputs", []):
+        (out_root / o).unlink(missing_ok=True)
@@ -9,6 +9,8 @@ CONF = ROOT / "data"  # model_aliases.csv lives here
 
 MOT_PARQUET = INT / "mot"                # partitioned parquet dataset root
 MOT_AGG_PARQUET = INT / "mot_agg.parquet"
+MOT_AGG_DIRTY_PARQUET = INT / "mot_agg_dirty.parquet"  # cohorts changed by the last incremental aggregate
+FAILURES_PARQUET = INT / "failures"      # failure items dataset root (one part per source CSV)
 RECALLS_PARQUET = INT / "recalls.parquet"
 VCA_PARQUET = INT / "vca.parquet"
 VED_JSON = INT / "ved_bands.json"
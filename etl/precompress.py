@@ -0,0 +1,77 @@
+# etl/precompress.py
+"""
+Precompressed siblings for published JSON: <doc>.json.gz and <doc>.json.br, so the
+static host can serve them directly instead of compressing on every cold request.
+
+ETL_PRECOMPRESS selects the formats ("gz,br", "gz", "br"; "1" = both, empty = off).
+Brotli is optional; without the `brotli` package only .gz is written.
+"""
+
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+import gzip
+import os
+
+try:
+    import brotli  # optional
+except Exception:
+    brotli = None
+
+def _formats_from_env() -> tuple[str, ...]:
+    raw = (os.environ.get("ETL_PRECOMPRESS", "") or "").strip().lower()
+    if raw in ("", "0", "off", "none"):
+        return ()
+    if raw in ("1", "all", "on"):
+        raw = "gz,br"
+    fmts = tuple(f.strip() for f in raw.split(",") if f.strip() in ("gz", "br"))
+    if "br" in fmts and brotli is None:
+        print("[precompress] brotli not installed; writing .gz only")
+        fmts = tuple(f for f in fmts if f != "br")
+    return fmts
+
+FORMATS = _formats_from_env()
+WORKERS = int(os.environ.get("ETL_PRECOMPRESS_WORKERS", "0") or 0) or (os.cpu_count() or 1)
+
+def _compress(data: bytes, fmt: str) -> bytes:
+    if fmt == "gz":
+        # mtime=0 keeps the output byte-stable across runs
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+def sibling_paths(path: Path, formats: Iterable[str] = FORMATS) -> list[Path]:
+    return [path.with_name(f"{path.name}.{fmt}") for fmt in formats]
+
+def needs_siblings(path: Path, formats: Iterable[str] = FORMATS) -> bool:
+    return any(not p.exists() for p in sibling_paths(path, formats))
+
+def write_siblings(path: Path, data: bytes | None = None, formats: Iterable[str] = FORMATS) -> int:
+    """Write the compressed siblings of `path` (from `data` if already in memory)."""
+    formats = tuple(formats)
+    if not formats:
+        return 0
+    if data is None:
+        data = Path(path).read_bytes()
+    for fmt, out in zip(formats, sibling_paths(Path(path), formats)):
+        tmp = out.with_name(out.name + ".tmp")
+        tmp.write_bytes(_compress(data, fmt))
+        tmp.replace(out)
+    return len(formats)
+
+def remove_siblings(path: Path, keep: Iterable[str] = ()) -> None:
+    """Delete the .gz/.br siblings of `path`, except the formats in `keep`."""
+    keep = tuple(keep)
+    for p in sibling_paths(Path(path), [f for f in ("gz", "br") if f not in keep]):
+        p.unlink(missing_ok=True)
+
+def precompress_files(paths: Iterable[Path], formats: Iterable[str] = FORMATS, workers: int = WORKERS) -> int:
+    """Compress many files on a thread pool (zlib and brotli release the GIL)."""
+    formats = tuple(formats)
+    paths = list(paths)
+    if not formats or not paths:
+        return 0
+    if workers <= 1 or len(paths) == 1:
+        return sum(write_siblings(p, None, formats) for p in paths)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return sum(ex.map(lambda p: write_siblings(p, None, formats), paths))
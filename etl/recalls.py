@@ -1,20 +1,88 @@
 # etl/recalls.py
-import pandas as pd, requests, io
-from datetime import datetime
+"""
+DVSA recalls file -> INT/recalls.parquet (make, model, year; one row per recall).
+
+The CSV is fetched with a conditional GET: the ETag/Last-Modified of the last
+download are kept in the "recalls" manifest and sent back as If-None-Match /
+If-Modified-Since. A 304 reuses the parsed Parquet copy; a 200 is streamed to disk
+and re-parsed.
+"""
+
+from __future__ import annotations
+from pathlib import Path
+import pandas as pd, requests
+
+from .paths import INT, RECALLS_PARQUET
+from .dates import parse_dates
+from .manifest import load_manifest, save_manifest
 
 DVSA_RECALLS = "https://www.check-vehicle-recalls.service.gov.uk/documents/RecallsFile.csv"  #  [oai_citation:15‡check-vehicle-recalls.service.gov.uk](https://www.check-vehicle-recalls.service.gov.uk/documents/RecallsFile.csv?utm_source=chatgpt.com)
+CHUNK_BYTES = 1 << 20
+TIMEOUT = 60
 
-def load_recalls() -> pd.DataFrame:
-    r = requests.get(DVSA_RECALLS, timeout=60)
-    r.raise_for_status()
-    df = pd.read_csv(io.BytesIO(r.content))
+def _parse_recalls(src) -> pd.DataFrame:
+    df = pd.read_csv(src)
     # Normalise columns
     df.rename(columns={"Make":"make","Recalls Model Information":"model","Launch Date":"launch_date"}, inplace=True)
-    df["year"] = pd.to_datetime(df["launch_date"], errors="coerce").dt.year
+    df["year"] = parse_dates(df["launch_date"], utc=False).dt.year.astype("Int64")
     df["make"] = df["make"].str.strip().str.title()
     df["model"] = df["model"].str.replace(r"\s+", " ", regex=True).str.strip()
     return df[["make","model","year"]]
 
+def _conditional_headers(prev: dict) -> dict[str, str]:
+    headers = {}
+    if prev.get("etag"):
+        headers["If-None-Match"] = prev["etag"]
+    if prev.get("last_modified"):
+        headers["If-Modified-Since"] = prev["last_modified"]
+    return headers
+
+def _fetch(url: str, prev: dict) -> tuple[pd.DataFrame | None, dict]:
+    """(parsed recalls, validators) for a 200; (None, prev) for a 304."""
+    with requests.get(url, headers=_conditional_headers(prev), stream=True, timeout=TIMEOUT) as r:
+        if r.status_code == 304:
+            return None, prev
+        r.raise_for_status()
+        tmp = INT / "RecallsFile.csv.part"
+        tmp.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in r.iter_content(CHUNK_BYTES):
+                    f.write(chunk)
+            df = _parse_recalls(tmp)
+        finally:
+            tmp.unlink(missing_ok=True)
+        validators = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
+    return df, {k: v for k, v in validators.items() if v}
+
+def load_recalls(url: str = DVSA_RECALLS, out_path: Path = RECALLS_PARQUET) -> pd.DataFrame:
+    """The recalls table, downloaded and parsed only if the server copy changed.
+
+    If DVSA cannot be reached (or errors) and a parsed copy exists, that copy is used.
+    """
+    manifest = load_manifest("recalls")
+    prev = manifest.get(url, {}) if out_path.exists() else {}
+    try:
+        df, validators = _fetch(url, prev)
+    except requests.RequestException as e:
+        if not out_path.exists():
+            raise
+        print(f"[recalls] WARNING: fetching {url} failed ({e.__class__.__name__}: {e}); using cached {out_path}")
+        return pd.read_parquet(out_path)
+    if df is None:
+        print(f"[recalls] not modified since {prev.get('last_modified') or prev.get('etag')}; using cached {out_path}")
+        return pd.read_parquet(out_path)
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(out_path, index=False)
+    manifest[url] = validators
+    save_manifest("recalls", manifest)
+    print(f"[recalls] wrote {len(df):,} recalls -> {out_path}")
+    return df
+
 def aggregate_recalls(df: pd.DataFrame) -> pd.DataFrame:
     g = df.groupby(["make","model","year"]).size().reset_index(name="count")
     return g
+
+if __name__ == "__main__":
+    load_recalls()
@@ -1,25 +1,51 @@
 import re
 import unicodedata
-from typing import Optional, Tuple
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from .paths import CONF
 
 ALIASES_CSV = CONF / "model_aliases.csv"
 
+# Body-style/transmission and engine words dropped from make/model keys, in one pass
+_NOISE_RE = re.compile(
+    r"\b(?:hatchback|saloon|estate|coupe|convertible|manual|automatic|auto"
+    r"|tdi|tsi|vvt|gdi|tdci|ecoboost|hdi|dci|mhev|phev|hev)\b"
+)
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_CACHE_SIZE = 1 << 18
+
+@lru_cache(maxsize=_CACHE_SIZE)
 def _slug(s: str) -> str:
     s = unicodedata.normalize("NFKD", s or "").encode("ascii", "ignore").decode("ascii")
-    s = re.sub(r"[^a-z0-9]+", "-", s.lower()).strip("-")
-    return s
+    return _NON_ALNUM_RE.sub("-", s.lower()).strip("-")
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _norm_str(s: str) -> str:
+    return _NON_ALNUM_RE.sub(" ", _NOISE_RE.sub("", s.lower())).strip()
 
 def _norm(s: str) -> str:
     if s is None or (isinstance(s, float) and pd.isna(s)):
         return ""
-    s2 = str(s).lower()
-    s2 = re.sub(r"\b(hatchback|saloon|estate|coupe|convertible|manual|automatic|auto)\b", "", s2)
-    s2 = re.sub(r"\b(tdi|tsi|vvt|gdi|tdci|ecoboost|hdi|dci|mhev|phev|hev)\b", "", s2)
-    s2 = re.sub(r"[^a-z0-9]+", " ", s2).strip()
-    return re.sub(r"\s+", " ", s2)
+    return _norm_str(str(s))
+
+def factorize_map(s: pd.Series, fn: Callable[[object], str]) -> pd.Series:
+    """Apply `fn` once per distinct value of `s` and broadcast back through the codes.
+
+    Make/model columns have a few thousand distinct spellings across millions of rows,
+    so this turns a per-row Python call into a per-unique one. Missing values get fn(None).
+    """
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    mapped = np.array([fn(u) for u in uniques] + [fn(None)], dtype=object)
+    return pd.Series(mapped[codes], index=s.index, name=s.name, dtype=object)
+
+def norm_series(s: pd.Series) -> pd.Series:
+    return factorize_map(s, _norm)
+
+def slug_series(s: pd.Series) -> pd.Series:
+    return factorize_map(s, _slug)
 
 def _load_alias_raw() -> pd.DataFrame:
     if not ALIASES_CSV.exists():
@@ -41,12 +67,12 @@ def load_alias_map() -> pd.DataFrame:
     for col in ("make_raw","model_raw"):
         if col not in raw:
             raw[col] = ""
-    raw["norm_make"] = raw["make_raw"].map(_norm)
-    raw["norm_model"] = raw["model_raw"].map(_norm)
+    raw["norm_make"] = norm_series(raw["make_raw"])
+    raw["norm_model"] = norm_series(raw["model_raw"])
     tgt_mk_col, tgt_md_col = _resolve_alias_columns(raw)
     if tgt_mk_col and tgt_md_col:
-        raw["norm_make_target"] = raw[tgt_mk_col].map(_norm)
-        raw["norm_model_target"] = raw[tgt_md_col].map(_norm)
+        raw["norm_make_target"] = norm_series(raw[tgt_mk_col])
+        raw["norm_model_target"] = norm_series(raw[tgt_md_col])
     else:
         raw["norm_make_target"] = raw["norm_make"]
         raw["norm_model_target"] = raw["norm_model"]
@@ -55,16 +81,16 @@ def load_alias_map() -> pd.DataFrame:
 
 def normalise_df(df: pd.DataFrame, make_col: str, model_col: str) -> pd.DataFrame:
     out = df.copy()
-    out["norm_make"] = out[make_col].map(_norm)
-    out["norm_model"] = out[model_col].map(_norm)
+    out["norm_make"] = norm_series(out[make_col])
+    out["norm_model"] = norm_series(out[model_col])
     alias = load_alias_map()
     if not alias.empty:
         out = out.merge(alias, how="left", on=["norm_make","norm_model"])
         out["norm_make"] = out["norm_make_target"].fillna(out["norm_make"])
         out["norm_model"] = out["norm_model_target"].fillna(out["norm_model"])
         out = out.drop(columns=["norm_make_target","norm_model_target"], errors="ignore")
-    out["make_slug"] = out["norm_make"].map(_slug)
-    out["model_slug"] = out["norm_model"].map(_slug)
+    out["make_slug"] = slug_series(out["norm_make"])
+    out["model_slug"] = slug_series(out["norm_model"])
     return out
 
 def slugify(s: str) -> str:
@@ -0,0 +1,88 @@
+# etl/sources.py
+"""
+CSV sources for the ingest stages: a plain .csv file, or a .csv member of a .zip
+archive read in place (stream-decompressed, never extracted to disk).
+
+A zip member is keyed "<archive relpath>!<member>" and fingerprinted from the zip
+directory (uncompressed size + CRC-32), so checking it never reads the data.
+"""
+
+from __future__ import annotations
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterator
+import zipfile
+import zlib
+
+from .manifest import fingerprint
+
+@dataclass(frozen=True)
+class CsvSource:
+    path: Path
+    member: str | None = None
+
+    def key(self, root: Path) -> str:
+        rel = self.path.relative_to(root).as_posix()
+        return rel if self.member is None else f"{rel}!{self.member}"
+
+    @contextmanager
+    def open(self) -> Iterator[IO[bytes]]:
+        if self.member is None:
+            with open(self.path, "rb") as f:
+                yield f
+        else:
+            with zipfile.ZipFile(self.path) as z, z.open(self.member) as f:
+                yield f
+
+    def fingerprint(self, prev: dict | None = None) -> dict:
+        if self.member is None:
+            return fingerprint(self.path, prev)
+        with zipfile.ZipFile(self.path) as z:
+            info = z.getinfo(self.member)
+        return {"size": info.file_size, "crc32": f"{info.CRC:08x}"}
+
+    def __str__(self) -> str:
+        return str(self.path) if self.member is None else f"{self.path}!{self.member}"
+
+def _csv_members(zip_path: Path) -> list[zipfile.ZipInfo]:
+    with zipfile.ZipFile(zip_path) as z:
+        return sorted(
+            (i for i in z.infolist()
+             if not i.is_dir() and i.filename.lower().endswith(".csv") and not i.filename.startswith("__MACOSX/")),
+            key=lambda i: i.filename,
+        )
+
+def _same_content(path: Path, info: zipfile.ZipInfo, chunk: int = 1 << 20) -> bool:
+    if path.stat().st_size != info.file_size:
+        return False
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            b = f.read(chunk)
+            if not b:
+                break
+            crc = zlib.crc32(b, crc)
+    return crc == info.CRC
+
+def find_csv_sources(folder: Path) -> list[CsvSource]:
+    """Every *.csv under `folder`, plus every .csv member of every *.zip under it.
+
+    A loose CSV at the path a member would be extracted to (next to the archive) and
+    with the member's size and CRC-32 is a copy left by an earlier unzip and is skipped,
+    so its rows are not ingested twice. Anything else is ingested alongside the zip.
+    """
+    zipped = []
+    extracted: dict[Path, tuple[Path, zipfile.ZipInfo]] = {}
+    for zp in sorted(folder.rglob("*.zip")):
+        for info in _csv_members(zp):
+            zipped.append(CsvSource(zp, info.filename))
+            extracted.setdefault(zp.parent / info.filename, (zp, info))
+    out = []
+    for p in sorted(folder.rglob("*.csv")):
+        zp, info = extracted.get(p, (None, None))
+        if zp is not None and _same_content(p, info):
+            print(f"[sources] skipping {p}: identical to {zp}!{info.filename} (left over from an extraction); delete it")
+            continue
+        out.append(CsvSource(p))
+    return out + zipped
@@ -1,8 +1,22 @@
 # etl/vca_co2.py
+import numpy as np
 import pandas as pd
 from .paths import VCA_PARQUET
 from .resolver import normalise_df
 
+def _numeric(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[col], errors="coerce").astype("float64")
+
+def _test_type(df: pd.DataFrame) -> pd.Series:
+    """str(value or "").upper().strip(), computed once per distinct value."""
+    if "Test Type" not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    codes, uniques = pd.factorize(df["Test Type"], use_na_sentinel=False)
+    labels = np.array([str(v or "").upper().strip() for v in uniques], dtype=object)
+    return pd.Series(labels[codes], index=df.index, dtype=object)
+
 def build_vca_parquet(csv_path: str) -> pd.DataFrame:
     # VCA CSV varies by vintage; keep robust columns
     usecols_guess = [
@@ -30,28 +44,34 @@ def build_vca_parquet(csv_path: str) -> pd.DataFrame:
     # Expand to a row per first_reg_year (best-effort banding)
     df["YearTo"] = pd.to_numeric(df.get("YearTo"), errors="coerce")
     df["YearTo"] = df["YearTo"].fillna(df["YearFrom"]).astype("int16")
-    records = []
-    for _, r in df.iterrows():
-        for y in range(int(r["YearFrom"]), int(r["YearTo"])+1):
-            records.append({
-                "norm_make": r["norm_make"],
-                "norm_model": r["norm_model"],
-                "make_slug": r["make_slug"],
-                "model_slug": r["model_slug"],
-                "first_use_year": int(y),
-                "fuel_type": str(r["FuelType"]).lower().strip(),
-                "co2_gkm": pd.to_numeric(r.get("CO2 (g/km)"), errors="coerce"),
-                "mpg_combined": pd.to_numeric(r.get("Combined MPG"), errors="coerce"),
-                "test_type": str(r.get("Test Type") or "").upper().strip()  # WLTP/NEDC
-            })
-    out = pd.DataFrame.from_records(records)
-    # collapse duplicates (take median)
-    out = (
-        out.groupby(["norm_make","norm_model","make_slug","model_slug","first_use_year","fuel_type"])
-           .agg(co2_gkm=("co2_gkm","median"), mpg_combined=("mpg_combined","median"),
-                test_type=("test_type", lambda s: s.mode().iloc[0] if len(s.dropna()) else ""))
-           .reset_index()
+    row = pd.DataFrame({
+        "norm_make": df["norm_make"],
+        "norm_model": df["norm_model"],
+        "make_slug": df["make_slug"],
+        "model_slug": df["model_slug"],
+        "fuel_type": df["FuelType"].str.lower().str.strip(),
+        "co2_gkm": _numeric(df, "CO2 (g/km)"),
+        "mpg_combined": _numeric(df, "Combined MPG"),
+        "test_type": _test_type(df),  # WLTP/NEDC
+    })
+    # Each row repeats once per year in [YearFrom, YearTo]; the year is YearFrom plus
+    # the repeat's offset within its run.
+    start = df["YearFrom"].to_numpy(dtype=np.int64)
+    n = np.maximum(df["YearTo"].to_numpy(dtype=np.int64) - start + 1, 0)
+    pos = np.repeat(np.arange(len(df)), n)
+    offset = np.arange(len(pos)) - np.repeat(np.cumsum(n) - n, n)
+    out = row.iloc[pos].reset_index(drop=True)
+    out.insert(4, "first_use_year", start[pos] + offset)
+
+    # collapse duplicates (take median; most common test type, ties to the first in sort order)
+    keys = ["norm_make","norm_model","make_slug","model_slug","first_use_year","fuel_type"]
+    med = out.groupby(keys)[["co2_gkm","mpg_combined"]].median()
+    mode = (
+        out.groupby(keys + ["test_type"]).size().rename("n").reset_index()
+           .sort_values("n", ascending=False, kind="stable")
+           .drop_duplicates(subset=keys).set_index(keys)["test_type"]
     )
+    out = med.join(mode).reset_index()
     out.to_parquet(VCA_PARQUET, index=False)
     return out
 
@@ -1,4 +1,5 @@
 import json
+import numpy as np
 import pandas as pd
 from typing import Optional, Dict, Any, List
 
@@ -9,11 +10,35 @@ def load_ved_bands(json_path: str) -> dict:
         raise ValueError("ved_bands.json missing 'eras'")
     return cfg
 
-def _find_band_2001to2017(bands: List[Dict[str, Any]], co2: float) -> Optional[Dict[str, Any]]:
-    for row in bands:
-        if row["co2_lo"] <= co2 <= row["co2_hi"]:
-            return row
-    return None
+class _Intervals:
+    """Closed [co2_lo, co2_hi] rows compiled for vectorised lookup.
+
+    Disjoint rows (the published tables) are sorted by co2_lo and searched with
+    searchsorted; overlapping ones fall back to first-match-in-list order.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = list(rows)
+        lo = np.array([float(r["co2_lo"]) for r in self.rows])
+        hi = np.array([float(r["co2_hi"]) for r in self.rows])
+        self.order = np.argsort(lo, kind="stable")
+        self.lo, self.hi = lo[self.order], hi[self.order]
+        self.disjoint = bool(np.all(self.lo[1:] > self.hi[:-1]))
+        self._lo, self._hi = lo, hi
+
+    def find(self, co2: np.ndarray) -> np.ndarray:
+        """Index into self.rows of the row containing each value, -1 if none."""
+        out = np.full(len(co2), -1, dtype=np.intp)
+        if not self.rows:
+            return out
+        if self.disjoint:
+            i = np.searchsorted(self.lo, co2, side="right") - 1
+            ok = (i >= 0) & (co2 <= self.hi[np.maximum(i, 0)])
+            out[ok] = self.order[i[ok]]
+        else:
+            for j in range(len(self.rows) - 1, -1, -1):
+                out[(self._lo[j] <= co2) & (co2 <= self._hi[j])] = j
+        return out
 
 def first_year_rate_post2017(ved_cfg: dict, co2_gkm: float) -> Optional[int]:
     era = ved_cfg["eras"].get("post2017", {})
@@ -23,20 +48,38 @@ def first_year_rate_post2017(ved_cfg: dict, co2_gkm: float) -> Optional[int]:
             return int(row["rate"])
     return None
 
-def ved_for_vehicle(ved_cfg: dict, co2_gkm: float, first_use_year: int, fuel_type: str) -> dict:
-    if pd.isna(co2_gkm) or co2_gkm <= 0:
-        return {"band": None, "annual": None, "first_year": None, "supplement": None}
+def ved_for_vehicles(ved_cfg: dict, co2_gkm, first_use_year, fuel_type=None) -> pd.DataFrame:
+    """ved_for_vehicle() for whole arrays: one row per vehicle with columns
+    band, annual, first_year and supplement (Python objects, None when unknown).
+    """
+    co2 = pd.to_numeric(pd.Series(co2_gkm), errors="coerce").to_numpy(dtype=float)
+    year = np.asarray(first_use_year)
+    n = len(co2)
+    band, annual, first_year, supp = (np.full(n, None, dtype=object) for _ in range(4))
 
     eras = ved_cfg.get("eras", {})
-    if first_use_year >= 2017:
+    known = ~np.isnan(co2) & (co2 > 0)
+    post_rows = np.flatnonzero(known & (year >= 2017))
+    pre_rows = np.flatnonzero(known & (year < 2017))
+
+    if len(post_rows):
         post = eras.get("post2017", {})
-        annual = post.get("standard_rate")
-        first_year = first_year_rate_post2017(ved_cfg, float(co2_gkm))
-        supp = post.get("expensive_car_supplement", None)
-        return {"band": None, "annual": int(annual) if annual is not None else None, "first_year": first_year, "supplement": {"expensive_car": supp}}
-    else:
-        pre = eras.get("2001to2017", {})
-        band_row = _find_band_2001to2017(pre.get("bands", []), float(co2_gkm))
-        if not band_row:
-            return {"band": None, "annual": None, "first_year": None, "supplement": None}
-        return {"band": band_row["band"], "annual": int(band_row["annual"]), "first_year": None, "supplement": None}
+        rate = post.get("standard_rate")
+        annual[post_rows] = int(rate) if rate is not None else None
+        fy = _Intervals(post.get("first_year", []))
+        hit = fy.find(co2[post_rows])
+        first_year[post_rows[hit >= 0]] = [int(fy.rows[i]["rate"]) for i in hit[hit >= 0]]
+        extra = post.get("expensive_car_supplement", None)
+        supp[post_rows] = [{"expensive_car": extra} for _ in post_rows]
+
+    if len(pre_rows):
+        bands = _Intervals(eras.get("2001to2017", {}).get("bands", []))
+        hit = bands.find(co2[pre_rows])
+        rows = pre_rows[hit >= 0]
+        band[rows] = [bands.rows[i]["band"] for i in hit[hit >= 0]]
+        annual[rows] = [int(bands.rows[i]["annual"]) for i in hit[hit >= 0]]
+
+    return pd.DataFrame({"band": band, "annual": annual, "first_year": first_year, "supplement": supp})
+
+def ved_for_vehicle(ved_cfg: dict, co2_gkm: float, first_use_year: int, fuel_type: str) -> dict:
+    return ved_for_vehicles(ved_cfg, [co2_gkm], [first_use_year], [fuel_type]).iloc[0].to_dict()
@@ -2,7 +2,40 @@
 import { useSearchParams } from 'next/navigation'
 import { useEffect, useState } from 'react'
 
+type PackIndex = { pack: string; cohorts: Record<string, [number, number]> }
+
+// One index request per make, shared by both sides of the comparison
+const packIndexes = new Map<string, Promise<PackIndex | null>>()
+
+function fetchPackIndex(make: string) {
+  if (!packIndexes.has(make)) {
+    packIndexes.set(make, fetch(`/data/_packs/${make}.idx.json`)
+      .then(res => (res.ok ? res.json() : null))
+      .catch(() => null))
+  }
+  return packIndexes.get(make)!
+}
+
+// Cohort from the make's pack (ETL_PUBLISH_FORMAT=pack|both): one ranged read at the offset
+// the index gives. Servers that ignore Range send the whole pack, which is sliced here.
+async function fetchPackedCohort(path: string) {
+  const [make, model, year] = path.split('/')
+  const idx = await fetchPackIndex(make)
+  const span = idx?.cohorts[`${model}/${year}`]
+  if (!idx || !span) return null
+  const [offset, length] = span
+  const res = await fetch(`/data/_packs/${idx.pack}`, {
+    headers: { Range: `bytes=${offset}-${offset + length - 1}` },
+  })
+  if (!res.ok) return null
+  const buf = new Uint8Array(await res.arrayBuffer())
+  const bytes = res.status === 206 ? buf : buf.subarray(offset, offset + length)
+  return JSON.parse(new TextDecoder().decode(bytes))
+}
+
 async function fetchCohort(path: string) {
+  const packed = await fetchPackedCohort(path).catch(() => null)
+  if (packed) return packed
   const res = await fetch(`/data/${path}.json`)
   if (!res.ok) return null
   return res.json()
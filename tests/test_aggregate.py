@@ -10,3 +10,168 @@ def test_aggregates_smoke():
     out = compute_aggregates(df)
     assert "Ford" in out and "Fiesta" in out["Ford"]
     assert 2013 in out["Ford"]["Fiesta"]
+
+def test_grouped_percentiles_match_nanpercentile():
+    import numpy as np
+    from etl.aggregate_mot import _grouped_percentiles
+    rng = np.random.default_rng(0)
+    n = 5000
+    df = pd.DataFrame({
+        "make": rng.choice(["Ford", "Vauxhall", "Kia"], n),
+        "age_at_test": rng.integers(3, 12, n),
+        "odometer": pd.array(rng.integers(0, 200000, n), dtype="Int64"),
+    })
+    df.loc[rng.random(n) < 0.1, "odometer"] = pd.NA
+    df.loc[(df["make"] == "Kia") & (df["age_at_test"] == 3), "odometer"] = pd.NA
+
+    got = _grouped_percentiles(df, ["make", "age_at_test"], "odometer")
+
+    for r in got.itertuples(index=False):
+        arr = df[(df["make"] == r.make) & (df["age_at_test"] == r.age_at_test)]["odometer"].dropna().to_numpy(dtype=float)
+        if arr.size == 0:
+            assert np.isnan(r.p50) and np.isnan(r.p90)
+            continue
+        assert r.p50 == float(np.nanpercentile(arr, 50))
+        assert r.p75 == float(np.nanpercentile(arr, 75))
+        assert r.p90 == float(np.nanpercentile(arr, 90))
+    assert len(got) == df.groupby(["make", "age_at_test"]).ngroups
+
+def test_merged_sketch_percentiles_within_one_bin():
+    import numpy as np
+    from etl.aggregate_mot import _grouped_percentiles, mileage_sketch, merge_sketches, sketch_percentiles
+    rng = np.random.default_rng(1)
+    n = 20000
+    df = pd.DataFrame({
+        "make": rng.choice(["Ford", "Vauxhall"], n),
+        "age_at_test": rng.integers(3, 6, n),
+        "odometer": rng.integers(0, 150000, n),
+    })
+    keys = ["make", "age_at_test"]
+    parts = [mileage_sketch(df.iloc[:7000], keys, bin_miles=500), mileage_sketch(df.iloc[7000:], keys, bin_miles=500)]
+
+    est = sketch_percentiles(merge_sketches(parts, keys), keys, bin_miles=500)
+    exact = _grouped_percentiles(df, keys, "odometer")
+
+    m = est.merge(exact, on=keys, suffixes=("_est", ""))
+    assert len(m) == len(exact)
+    for q in (50, 75, 90):
+        assert (m[f"p{q}_est"] - m[f"p{q}"]).abs().max() < 500
+
+def test_incremental_update_matches_full_sketch_rebuild(tmp_path, monkeypatch):
+    import etl.aggregate_mot as am
+    import etl.manifest as manifest
+
+    def write_part(year, name, rows):
+        d = tmp_path / "mot" / f"test_year={year}"
+        d.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame([
+            {"make": mk, "model": md, "test_date": pd.Timestamp(f"{year}-05-01", tz="UTC"), "odometer": odo,
+             "result": res, "fuel_type": "PE", "age_at_test": year - fu,
+             "first_use_date": pd.Timestamp(f"{fu}-01-01", tz="UTC")}
+            for mk, md, odo, res, fu in rows
+        ]).to_parquet(d / name, index=False)
+
+    monkeypatch.setattr(am, "INT", tmp_path)
+    monkeypatch.setattr(am, "MOT_PARQUET", tmp_path / "mot")
+    monkeypatch.setattr(am, "MOT_AGG_PARQUET", tmp_path / "mot_agg.parquet")
+    monkeypatch.setattr(am, "MOT_AGG_DIRTY_PARQUET", tmp_path / "dirty.parquet")
+    monkeypatch.setattr(am, "AGG_STATE_DIR", tmp_path / "agg_state")
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", tmp_path / "manifests")
+
+    write_part(2023, "a.parquet", [("FORD", "FIESTA", 1000, "P", 2013), ("KIA", "RIO", 500, "F", 2020)])
+    write_part(2024, "a.parquet", [("FORD", "FIESTA", 2000, "F", 2013)])
+    am.update_aggregates()
+    write_part(2024, "b.parquet", [("FORD", "FIESTA", 3000, "P", 2013), ("FORD", "FOCUS", 9000, "P", 2019)])
+    inc = am.update_aggregates()
+
+    dirty = pd.read_parquet(tmp_path / "dirty.parquet")
+    assert sorted(dirty["model"]) == ["FIESTA", "FOCUS"]
+    full = am.compute_aggregates(sketch=True, filters=am._env_filters())
+    pd.testing.assert_frame_equal(inc.reset_index(drop=True), full.reset_index(drop=True), check_dtype=False)
+
+def _write_results(root):
+    for year, rows in {2023: [("FORD", "FIESTA", "4"), ("Ford", "Fiesta ", "7")], 2024: [("KIA", "RIO", "4")]}.items():
+        d = root / f"test_year={year}"
+        d.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame([
+            {"make": mk, "model": md, "test_date": pd.Timestamp(f"{year}-05-01", tz="UTC"), "odometer": 1000,
+             "result": "P", "fuel_type": "PE", "test_class_id": cls, "age_at_test": 5,
+             "first_use_date": pd.Timestamp(f"{year - 5}-01-01", tz="UTC")}
+            for mk, md, cls in rows
+        ]).to_parquet(d / "a.parquet", index=False)
+
+def test_read_results_projects_columns_and_pushes_down_filters(tmp_path):
+    from etl.aggregate_mot import _read_results
+    _write_results(tmp_path)
+    base = {"make": None, "model": None, "y_min": None, "y_max": None, "test_class_id": [], "test_type": []}
+
+    df = _read_results(tmp_path, columns=("make", "model", "odometer"))
+    assert set(df.columns) == {"make", "model", "odometer", "age_at_test", "first_use_date"}
+    assert df["age_at_test"].isna().all()
+    assert len(df) == 3
+
+    df = _read_results(tmp_path, columns=("make", "model"), filters={**base, "make": "ford", "model": "FIESTA"})
+    assert sorted(df["make"].astype(str)) == ["FORD", "Ford"]
+    df = _read_results(tmp_path, columns=("make",), filters={**base, "test_class_id": ["7"], "y_min": 2023})
+    assert df["make"].astype(str).tolist() == ["Ford"]
+
+def test_read_results_filter_matching_nothing_is_empty(tmp_path):
+    from etl.aggregate_mot import _read_results
+    _write_results(tmp_path)
+    base = {"make": None, "model": None, "y_min": None, "y_max": None, "test_class_id": [], "test_type": []}
+    assert _read_results(tmp_path, columns=("make",), filters={**base, "make": "tesla"}).empty
+    assert _read_results(tmp_path, columns=("make",), filters={**base, "make": "kia", "model": "fiesta"}).empty
+
+def test_full_incremental_rebuild_drops_leftover_state(tmp_path, monkeypatch):
+    import shutil
+    import etl.aggregate_mot as am
+    import etl.manifest as manifest
+    monkeypatch.setattr(am, "INT", tmp_path)
+    monkeypatch.setattr(am, "MOT_PARQUET", tmp_path / "mot")
+    monkeypatch.setattr(am, "MOT_AGG_PARQUET", tmp_path / "mot_agg.parquet")
+    monkeypatch.setattr(am, "MOT_AGG_DIRTY_PARQUET", tmp_path / "dirty.parquet")
+    monkeypatch.setattr(am, "AGG_STATE_DIR", tmp_path / "agg_state")
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", tmp_path / "manifests")
+    _write_results(tmp_path / "mot")
+    # Same (make, model, firstRegYear, age) group as the 2023 FORD FIESTA row, but failed
+    pd.DataFrame([{"make": "FORD", "model": "FIESTA", "test_date": pd.Timestamp("2024-05-01", tz="UTC"),
+                   "odometer": 1000, "result": "F", "fuel_type": "PE", "test_class_id": "4", "age_at_test": 5,
+                   "first_use_date": pd.Timestamp("2018-01-01", tz="UTC")}]
+                 ).to_parquet(tmp_path / "mot" / "test_year=2024" / "b.parquet", index=False)
+    assert am.update_aggregates()["pass_rate"].min() == 0.5
+
+    # Partition removed while the manifest is reset: its old state must not come back
+    shutil.rmtree(tmp_path / "mot" / "test_year=2024")
+    shutil.rmtree(tmp_path / "manifests")
+    inc = am.update_aggregates()
+    assert sorted(inc["model"].astype(str).unique()) == ["FIESTA", "Fiesta "]
+    assert inc["pass_rate"].tolist() == [1.0, 1.0]
+    assert sorted(p.name for p in (tmp_path / "agg_state").iterdir()) == [
+        "test_year=2023.counts.parquet", "test_year=2023.mileage.parquet"]
+
+def test_incremental_noop_and_exact_rebuild_in_between(tmp_path, monkeypatch):
+    import shutil
+    import etl.aggregate_mot as am
+    import etl.manifest as manifest
+    monkeypatch.setattr(am, "INT", tmp_path)
+    monkeypatch.setattr(am, "MOT_PARQUET", tmp_path / "mot")
+    monkeypatch.setattr(am, "MOT_AGG_PARQUET", tmp_path / "mot_agg.parquet")
+    monkeypatch.setattr(am, "MOT_AGG_DIRTY_PARQUET", tmp_path / "dirty.parquet")
+    monkeypatch.setattr(am, "AGG_STATE_DIR", tmp_path / "agg_state")
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", tmp_path / "manifests")
+    _write_results(tmp_path / "mot")
+    am.update_aggregates()
+    assert len(pd.read_parquet(tmp_path / "dirty.parquet")) == 3
+
+    # Nothing changed: the previous run's dirty cohorts must not be published again
+    am.update_aggregates()
+    dirty = pd.read_parquet(tmp_path / "dirty.parquet")
+    assert dirty.empty and list(dirty.columns) == ["make", "model", "firstRegYear"]
+
+    # An exact rebuild in between is not spliced with sketch state
+    am.compute_aggregates(sketch=False, filters=am._env_filters())
+    assert not (tmp_path / "agg_state").exists() and not (tmp_path / "dirty.parquet").exists()
+    shutil.rmtree(tmp_path / "mot" / "test_year=2024")
+    inc = am.update_aggregates()
+    full = am.compute_aggregates(sketch=True, filters=am._env_filters())
+    pd.testing.assert_frame_equal(inc.reset_index(drop=True), full.reset_index(drop=True), check_dtype=False)
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from etl.alias_seed import suggest_aliases, _token_set_ratio
+from etl.resolver import norm_series
+
+
+def _canon(rows):
+    canon = pd.DataFrame(rows, columns=["make", "model"])
+    canon["mk"] = norm_series(canon["make"])
+    canon["md"] = norm_series(canon["model"])
+    return canon
+
+
+def test_suggestions_are_blocked_by_make_and_ranked():
+    canon = _canon([("Ford", "Fiesta"), ("Ford", "Focus"), ("Ford", "Fiesta St"), ("Vauxhall", "Fiesta")])
+    pairs = pd.DataFrame({"make_raw": ["FORD", "FORD", "KIA"],
+                          "model_raw": ["FIESTA ZETEC S 1.0 ECOBOOST", "FOCUS TITANIUM", "CEED"]})
+    out = suggest_aliases(pairs, canon, top_n=2, min_score=60)
+    fiesta = out[out["model_raw"] == "FIESTA ZETEC S 1.0 ECOBOOST"]
+    assert fiesta.iloc[0][["suggested_make", "suggested_model", "score", "rank"]].tolist() == ["Ford", "Fiesta", 100, 1]
+    assert set(fiesta["suggested_make"]) == {"Ford"}
+    assert out[out["model_raw"] == "FOCUS TITANIUM"].iloc[0]["suggested_model"] == "Focus"
+    assert "CEED" not in set(out["model_raw"])
+
+
+def test_token_set_ratio_matches_fuzzywuzzy_definition():
+    assert _token_set_ratio("fiesta zetec s", "fiesta") == 100
+    assert _token_set_ratio("golf", "polo") <= 50
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+import etl.bucket_failures as bf
+
+
+def test_spilled_hash_join_matches_in_memory_join(tmp_path, monkeypatch):
+    rng = np.random.default_rng(3)
+    n = 2000
+    results = pd.DataFrame({
+        "test_id": np.arange(n, dtype="int64"),
+        "make": pd.Categorical(rng.choice(["FORD", "KIA"], n)),
+        "model": pd.Categorical(rng.choice(["FIESTA", "RIO", "CEED"], n)),
+        "test_date": pd.Timestamp("2024-05-01", tz="UTC"),
+        "age_at_test": pd.array(rng.integers(3, 15, n), dtype="Int16"),
+    })
+    (tmp_path / "mot" / "test_year=2024").mkdir(parents=True)
+    results.to_parquet(tmp_path / "mot" / "test_year=2024" / "part-a.parquet", index=False)
+    m = 5000
+    failures = pd.DataFrame({
+        "rfr_code": "x",
+        "fail_bucket": rng.choice(["brakes", "lights", "other"], m),
+        "test_id": rng.integers(0, n + 100, m).astype(str),  # some items have no matching test
+    })
+    (tmp_path / "failures").mkdir()
+    failures.to_parquet(tmp_path / "failures" / "part-a.parquet", index=False)
+
+    monkeypatch.setattr(bf, "MOT_PARQUET", tmp_path / "mot")
+    monkeypatch.setattr(bf, "FAILURES_PARQUET", tmp_path / "failures")
+    monkeypatch.setattr(bf, "OUT_PARQUET", tmp_path / "failures_bucketed.parquet")
+    monkeypatch.setattr(bf, "SPILL_DIR", tmp_path / "spill")
+
+    out = bf.bucket_failures(n_buckets=7, batch_rows=300, workers=2)
+
+    res = results.assign(firstRegYear=2024 - results["age_at_test"].astype("int64"))
+    exp = (
+        failures.assign(test_id=failures["test_id"].astype("int64"))
+        .merge(res, on="test_id")
+        .groupby(["make", "model", "firstRegYear", "fail_bucket"], observed=True).size()
+        .rename("count").reset_index().rename(columns={"fail_bucket": "category"})
+        .astype({"make": str, "model": str})
+    )
+    key = ["make", "model", "firstRegYear", "category"]
+    got = pd.read_parquet(tmp_path / "failures_bucketed.parquet").sort_values(key).reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, exp.sort_values(key).reset_index(drop=True), check_dtype=False)
+    assert len(out) == len(got)
+    assert not (tmp_path / "spill").exists()
@@ -0,0 +1,22 @@
+import pandas as pd
+
+from etl.dates import detect_format, parse_dates
+
+
+def test_detect_format_prefers_the_format_that_parses_most():
+    assert detect_format(["2023-05-10", "2024-01-02 09:30:00"]) == "ISO8601"
+    assert detect_format(["12/13/24", "01/02/23"]) == "%m/%d/%y"
+    # 25/12/2023 only parses day-first
+    assert detect_format(["05/03/2023", "25/12/2023"]) == "%d/%m/%Y"
+    assert detect_format([None, ""]) is None
+
+
+def test_parse_dates_matches_to_datetime_and_keeps_missing():
+    s = pd.Series(["2023-05-10", None, "2024-01-02", "2023-05-10", "", "junk"], index=list("abcdef"))
+    out = parse_dates(s)
+    assert out.index.tolist() == list("abcdef")
+    assert str(out.dtype) == "datetime64[ns, UTC]"
+    assert out["a"] == pd.Timestamp("2023-05-10", tz="UTC") == out["d"]
+    assert out[["b", "e", "f"]].isna().all()
+    naive = parse_dates(pd.Series(["12/13/24", "01/02/23"]), utc=False)
+    assert naive.tolist() == [pd.Timestamp("2024-12-13"), pd.Timestamp("2023-01-02")]
@@ -0,0 +1,120 @@
+import hashlib
+import io
+import os
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import etl.download_sources as dl
+
+
+def _zip_bytes(name, payload):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr(name, payload)
+    return buf.getvalue()
+
+
+FILES = {
+    "/results.zip": _zip_bytes("results.csv", os.urandom(3 << 20).hex()),
+    "/failures.zip": _zip_bytes("failures.csv", "test_id,rfr_id\n1,101\n"),
+    "/lookups.zip": _zip_bytes("fuel.csv", "code,description\nPE,Petrol\n"),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    drop_once = set()  # paths whose first full response is cut short
+    fail_once = set()  # paths whose first request gets a 503
+    ranges = []
+
+    def do_GET(self):
+        body = FILES[self.path]
+        if self.path in self.fail_once:
+            self.fail_once.discard(self.path)
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start = 0
+        rng = self.headers.get("Range")
+        if rng:
+            start = int(rng.split("=")[1].split("-")[0])
+            type(self).ranges.append((self.path, start))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        if self.path in self.drop_once:
+            self.drop_once.discard(self.path)
+            self.wfile.write(body[start:start + (5 << 20)])
+            self.wfile.flush()
+            self.connection.close()
+            return
+        self.wfile.write(body[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+
+
+def test_download_resumes_with_range_after_a_drop(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(dl.time, "sleep", lambda s: None)
+    _Handler.drop_once = {"/results.zip"}
+    _Handler.ranges = []
+    body = FILES["/results.zip"]
+    out = dl._download(f"{server}/results.zip", tmp_path / "results.zip", hashlib.sha256(body).hexdigest())
+    assert out.read_bytes() == body
+    assert len(_Handler.ranges) == 1 and _Handler.ranges[0][1] > 0
+    assert not (tmp_path / "results.zip.part").exists()
+
+
+def test_download_restarts_when_partial_is_larger_than_remote(server, tmp_path):
+    body = FILES["/failures.zip"]
+    (tmp_path / "failures.zip.part").write_bytes(b"x" * (len(body) + 10))
+    out = dl._download(f"{server}/failures.zip", tmp_path / "failures.zip")
+    assert out.read_bytes() == body
+
+
+def test_download_accepts_416_for_an_already_complete_partial(server, tmp_path):
+    body = FILES["/failures.zip"]
+    (tmp_path / "failures.zip.part").write_bytes(body)
+    assert dl._download(f"{server}/failures.zip", tmp_path / "failures.zip").read_bytes() == body
+
+
+def test_download_retries_server_errors(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(dl.time, "sleep", lambda s: None)
+    _Handler.fail_once = {"/lookups.zip"}
+    out = dl._download(f"{server}/lookups.zip", tmp_path / "lookups.zip")
+    assert out.read_bytes() == FILES["/lookups.zip"]
+    assert not _Handler.fail_once
+
+
+def test_download_rejects_checksum_mismatch(server, tmp_path):
+    with pytest.raises(IOError):
+        dl._download(f"{server}/lookups.zip", tmp_path / "lookups.zip", "0" * 64)
+    assert not (tmp_path / "lookups.zip").exists()
+
+
+def test_download_all_fetches_concurrently_and_keeps_data_zipped(server, tmp_path):
+    dl.download_all(f"{server}/results.zip", f"{server}/failures.zip", f"{server}/lookups.zip", out_dir=tmp_path)
+    assert (tmp_path / "results" / "results.zip").exists()
+    assert (tmp_path / "failures" / "failures.zip").exists()
+    assert not (tmp_path / "results" / "results.csv").exists()
+    assert (tmp_path / "lookups" / "fuel.csv").read_text().startswith("code,")
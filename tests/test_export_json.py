@@ -0,0 +1,46 @@
+import json
+import pandas as pd
+from etl.export_json import write_cohort_json
+
+RECALLS = pd.DataFrame({
+    "make": ["Ford", "Ford", "Ford", "Ford", "Renault"],
+    "model": ["KA", "Kadjar", "Focus ST-Line", "Fiesta / KA+", "KA"],
+    "year": [2019, 2020, 2021, 2022, 2019],
+    "count": [1, 2, 3, 4, 5],
+})
+VCA = pd.DataFrame({
+    "make": ["FORD", "FORD", "FORD"],
+    "model_family": ["Focus", "Focus ST", "Kadjar"],
+    "co2": [120.0, 140.0, 99.0],
+    "mpg_combined": [50.0, 40.0, 60.0],
+    "test_cycle": ["WLTP", "WLTP", "NEDC"],
+})
+
+def _read(root, make, model, year):
+    return json.loads((root / make / model / f"{year}.json").read_text())
+
+def test_recalls_and_vca_match_whole_words_per_make(tmp_path):
+    aggs = {"Ford": {"Ka": {2018: {"n": 1}, 2019: {"n": 2}}, "Focus": {2017: {"n": 3}}, "Focus ST": {2017: {"n": 4}}}}
+    write_cohort_json(tmp_path, aggs, RECALLS, VCA)
+
+    ka = _read(tmp_path, "ford", "ka", 2018)
+    assert ka["recalls_timeline"] == [{"year": 2019, "count": 1}, {"year": 2022, "count": 4}]
+    assert ka["official"] == {"co2_g_km": None, "mpg_combined": None, "cycle": None}
+    assert _read(tmp_path, "ford", "ka", 2019)["recalls_timeline"] == ka["recalls_timeline"]
+
+    focus = _read(tmp_path, "ford", "focus", 2017)
+    assert focus["recalls_timeline"] == [{"year": 2021, "count": 3}]
+    assert focus["official"] == {"co2_g_km": 130.0, "mpg_combined": 45.0, "cycle": "WLTP"}
+    st = _read(tmp_path, "ford", "focus-st", 2017)
+    assert st["recalls_timeline"] == [{"year": 2021, "count": 3}]  # "ST-Line" splits into words
+    assert st["official"]["co2_g_km"] == 140.0
+
+def test_rewritten_document_drops_stale_siblings(tmp_path, monkeypatch):
+    import etl.export_json as ej
+    monkeypatch.setattr(ej, "PRECOMPRESS", ())
+    doc = tmp_path / "ford" / "ka" / "2018.json"
+    doc.parent.mkdir(parents=True)
+    doc.write_bytes(b"{}")
+    (tmp_path / "ford" / "ka" / "2018.json.gz").write_bytes(b"stale")
+    write_cohort_json(tmp_path, {"Ford": {"Ka": {2018: {"n": 1}}}}, RECALLS, VCA)
+    assert not (tmp_path / "ford" / "ka" / "2018.json.gz").exists()
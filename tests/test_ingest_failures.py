@@ -0,0 +1,30 @@
+import pandas as pd
+import etl.ingest_failures as inf
+import etl.manifest as manifest
+
+CSV = """test_id,rfr_id,rfr_type_code,dangerous_mark,deficiency_category
+1,101,F,,MAJOR
+1,102,F,,Minor
+2,101,P,,
+3,999,F,,Dangerous
+"""
+
+def test_ingest_failures_streams_batches_and_drops_legacy_file(tmp_path, monkeypatch):
+    raw, out = tmp_path / "raw", tmp_path / "int"
+    (raw / "failures").mkdir(parents=True)
+    (raw / "failures" / "failures.csv").write_text(CSV, encoding="utf-8")
+    out.mkdir()
+    (out / "failures.parquet").write_bytes(b"old single-file output")
+    monkeypatch.setattr(inf, "RAW", raw)
+    monkeypatch.setattr(inf, "INT", out)
+    monkeypatch.setattr(inf, "FAILURES_PARQUET", out / "failures")
+    monkeypatch.setattr(inf, "cached_lookups", lambda d: {"rfr_bucket": {"101": "brakes", "102": "tyres"}})
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", out / "manifests")
+
+    inf.ingest_failures(workers=1, batch_rows=1)
+
+    assert not (out / "failures.parquet").exists()
+    df = pd.read_parquet(out / "failures").sort_values(["test_id", "rfr_code"]).reset_index(drop=True)
+    assert df["fail_bucket"].tolist() == ["brakes", "tyres", "brakes", "other"]
+    assert df["deficiency"].tolist() == ["major", "minor", "nan", "dangerous"]
+    assert df["test_id"].tolist() == ["1", "1", "2", "3"]
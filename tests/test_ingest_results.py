@@ -0,0 +1,117 @@
+import zipfile
+import pandas as pd
+import pyarrow.dataset as ds
+import etl.ingest_results as ir
+import etl.manifest as manifest
+
+CSV = """test_id,vehicle_id,test_date,test_class_id,test_type,test_result,test_mileage,postcode_area,make,model,colour,fuel_type,cylinder_capacity,first_use_date,completed_date
+1,10,2023-05-10,4,NT,P,72000,AB,FORD,FIESTA,RED,PE,998,2013-06-01,2023-05-10 10:00:00
+2,11,2024-05-11,4,NT,F,"79,000",AB,FORD,FIESTA,RED,PE,998,2013-06-01,2024-05-11 11:00:00
+3,12,2024-01-02,4,NT,PASSED,12000,CD,VAUXHALL,CORSA,BLUE,DI,1248,2020-03-01,2024-01-02 09:30:00
+"""
+
+def test_ingest_results_streams_batches(tmp_path, monkeypatch):
+    raw, out = tmp_path / "raw", tmp_path / "int"
+    (raw / "results").mkdir(parents=True)
+    (raw / "results" / "results.csv").write_text(CSV, encoding="utf-8")
+    monkeypatch.setattr(ir, "RAW", raw)
+    monkeypatch.setattr(ir, "INT", out)
+    monkeypatch.setattr(ir, "MOT_PARQUET", out / "mot")
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", out / "manifests")
+
+    ir.ingest_results(batch_rows=1)
+
+    df = ds.dataset(out / "mot", format="parquet", partitioning="hive").to_table().to_pandas()
+    df = df.sort_values("odometer").reset_index(drop=True)
+    assert sorted(df["test_year"].unique()) == [2023, 2024]
+    assert df["odometer"].tolist() == [12000, 72000, 79000]
+    assert df["result"].tolist() == ["P", "P", "F"]
+    assert df["fuel_type"].tolist() == ["DI", "PE", "PE"]
+    assert df["age_at_test"].tolist() == [3, 9, 10]
+
+def test_ingest_results_reads_every_csv_in_parallel(tmp_path, monkeypatch):
+    raw, out = tmp_path / "raw", tmp_path / "int"
+    lines = CSV.splitlines()
+    (raw / "results" / "2023").mkdir(parents=True)
+    (raw / "results" / "2023" / "a.csv").write_text("\n".join(lines[:3]) + "\n", encoding="utf-8")
+    (raw / "results" / "b.csv").write_text("\n".join([lines[0]] + lines[3:]) + "\n", encoding="utf-8")
+    monkeypatch.setattr(ir, "RAW", raw)
+    monkeypatch.setattr(ir, "INT", out)
+    monkeypatch.setattr(ir, "MOT_PARQUET", out / "mot")
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", out / "manifests")
+
+    ir.ingest_results(workers=2)
+
+    parts = sorted(p.relative_to(out / "mot").parent.as_posix() for p in (out / "mot").rglob("*.parquet"))
+    assert parts == ["test_year=2023", "test_year=2024", "test_year=2024"]
+    df = ds.dataset(out / "mot", format="parquet", partitioning="hive").to_table().to_pandas()
+    assert len(df) == 3
+
+def test_ingest_results_only_reparses_changed_files(tmp_path, monkeypatch):
+    raw, out = tmp_path / "raw", tmp_path / "int"
+    lines = CSV.splitlines()
+    (raw / "results").mkdir(parents=True)
+    (raw / "results" / "a.csv").write_text("\n".join(lines[:2]) + "\n", encoding="utf-8")
+    (raw / "results" / "b.csv").write_text("\n".join([lines[0]] + lines[2:3]) + "\n", encoding="utf-8")
+    monkeypatch.setattr(ir, "RAW", raw)
+    monkeypatch.setattr(ir, "INT", out)
+    monkeypatch.setattr(ir, "MOT_PARQUET", out / "mot")
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", out / "manifests")
+
+    ir.ingest_results(workers=1)
+    part_2023 = next((out / "mot" / "test_year=2023").glob("*.parquet"))
+    before = part_2023.stat().st_mtime_ns
+
+    (raw / "results" / "b.csv").write_text("\n".join([lines[0]] + lines[2:]) + "\n", encoding="utf-8")
+    ir.ingest_results(workers=1)
+
+    assert part_2023.stat().st_mtime_ns == before
+    df = ds.dataset(out / "mot", format="parquet", partitioning="hive").to_table().to_pandas()
+    assert len(df) == 3
+
+    (raw / "results" / "b.csv").unlink()
+    ir.ingest_results(workers=1)
+    df = ds.dataset(out / "mot", format="parquet", partitioning="hive").to_table().to_pandas()
+    assert df["odometer"].tolist() == [72000]
+
+def test_ingest_results_writes_compact_schema(tmp_path, monkeypatch):
+    raw, out = tmp_path / "raw", tmp_path / "int"
+    (raw / "results").mkdir(parents=True)
+    bad = CSV.replace('"79,000"', "99999999999")
+    (raw / "results" / "results.csv").write_text(bad, encoding="utf-8")
+    monkeypatch.setattr(ir, "RAW", raw)
+    monkeypatch.setattr(ir, "INT", out)
+    monkeypatch.setattr(ir, "MOT_PARQUET", out / "mot")
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", out / "manifests")
+
+    ir.ingest_results(workers=1)
+
+    schema = ds.dataset(out / "mot", format="parquet", partitioning="hive").schema
+    for col in ("make", "model", "result", "fuel_type"):
+        assert str(schema.field(col).type).startswith("dictionary")
+    assert str(schema.field("odometer").type) == "int32"
+    assert str(schema.field("age_at_test").type) == "int16"
+    df = ds.dataset(out / "mot", format="parquet", partitioning="hive").to_table().to_pandas()
+    assert df["make"].dtype == "category"
+    assert df["odometer"].isna().sum() == 1  # out of int32 range
+
+def test_ingest_results_reads_csvs_inside_a_zip(tmp_path, monkeypatch):
+    raw, out = tmp_path / "raw", tmp_path / "int"
+    lines = CSV.splitlines()
+    (raw / "results").mkdir(parents=True)
+    with zipfile.ZipFile(raw / "results" / "results.zip", "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("2023/a.csv", "\n".join(lines[:3]) + "\n")
+        z.writestr("b.csv", "\n".join([lines[0]] + lines[3:]) + "\n")
+    monkeypatch.setattr(ir, "RAW", raw)
+    monkeypatch.setattr(ir, "INT", out)
+    monkeypatch.setattr(ir, "MOT_PARQUET", out / "mot")
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", out / "manifests")
+
+    ir.ingest_results(workers=2)
+    df = ds.dataset(out / "mot", format="parquet", partitioning="hive").to_table().to_pandas()
+    assert sorted(df["odometer"].tolist()) == [12000, 72000, 79000]
+    assert not any((raw / "results").rglob("*.csv"))
+
+    parts = {p: p.stat().st_mtime_ns for p in (out / "mot").rglob("*.parquet")}
+    ir.ingest_results(workers=1)
+    assert {p: p.stat().st_mtime_ns for p in (out / "mot").rglob("*.parquet")} == parts
@@ -0,0 +1,214 @@
+import json
+
+from etl.join_publish import _write_pack, read_packed_cohort, PACK_DIR
+
+
+def test_pack_roundtrip_and_merge(tmp_path):
+    pack_dir = tmp_path / PACK_DIR
+    docs = {
+        "fiesta/2015": json.dumps({"model": "Fiesta", "firstRegYear": 2015}).encode(),
+        "focus/2012": json.dumps({"model": "Focus", "firstRegYear": 2012}).encode(),
+    }
+    assert _write_pack(pack_dir, "ford", dict(docs), merge=False)
+    assert read_packed_cohort("ford", "fiesta", 2015, root=tmp_path)["model"] == "Fiesta"
+    assert read_packed_cohort("ford", "ka", 2010, root=tmp_path) is None
+
+    # Rewriting identical content is a no-op
+    assert not _write_pack(pack_dir, "ford", dict(docs), merge=False)
+
+    # A partial run merges new cohorts into the existing pack
+    extra = {"ka/2010": json.dumps({"model": "Ka", "firstRegYear": 2010}).encode()}
+    assert _write_pack(pack_dir, "ford", extra, merge=True)
+    assert read_packed_cohort("ford", "ka", 2010, root=tmp_path)["model"] == "Ka"
+    assert read_packed_cohort("ford", "focus", 2012, root=tmp_path)["firstRegYear"] == 2012
+    assert sorted(p.name for p in pack_dir.iterdir()) == ["ford.idx.json", "ford.pack"]
+
+
+def _cohort_frame():
+    import numpy as np
+    import pandas as pd
+    from etl.join_publish import _norm
+    rng = np.random.default_rng(0)
+    spellings = [("FORD", "FOCUS"), ("Ford ", "Focus"), ("ford", "FIESTA"), ("VAUXHALL", "CORSA"), ("Vauxhall", "corsa ")]
+    rows = [
+        {"make": mk, "model": md, "firstRegYear": int(y), "age_at_test": int(a), "pass_rate": float(rng.random())}
+        for mk, md in spellings for y in (2010, 2011) for a in rng.choice(np.arange(3, 12), 4, replace=False)
+    ]
+    mot = pd.DataFrame(rows).sample(frac=1, random_state=1).reset_index(drop=True)
+    mot["norm_make"] = mot["make"].map(_norm)
+    mot["norm_model"] = mot["model"].map(_norm)
+    return mot
+
+
+def test_cohort_slices_match_boolean_selection():
+    from etl.join_publish import _cohort_slices
+    mot = _cohort_frame()
+    ordered = mot.sort_values(["norm_make","norm_model","firstRegYear","age_at_test"], kind="stable").reset_index(drop=True)
+    slices = _cohort_slices(ordered)
+
+    cohorts = mot[["norm_make","norm_model","firstRegYear"]].drop_duplicates()
+    assert len(slices) == len(cohorts) == 6
+    cols = ["age_at_test","make","model","pass_rate"]
+    for mk, md, y in cohorts.itertuples(index=False):
+        old = mot[(mot["norm_make"] == mk) & (mot["norm_model"] == md) & (mot["firstRegYear"] == y)]
+        lo, hi = slices[(mk, md, y)]
+        new = ordered.iloc[lo:hi]
+        assert new["age_at_test"].is_monotonic_increasing
+        assert new.sort_values(cols)[cols].values.tolist() == old.sort_values(cols)[cols].values.tolist()
+
+
+def _linear_vca_panel(vca, mk_norm, md_norm, first_year, ved_bands):
+    """The per-cohort scan _vca_index replaced."""
+    from etl.join_publish import _norm, _compact_float
+    from etl.ved import ved_for_vehicle
+    df = vca.copy(); df.columns = [c.lower() for c in df.columns]
+    sub = df[(df["norm_make"].map(_norm) == mk_norm) & (df["norm_model"].map(_norm) == md_norm)
+             & (df["first_use_year"].astype("Int64") == int(first_year))]
+    panels = []
+    for _, r in sub.iterrows():
+        ved = ved_for_vehicle(ved_bands, r["co2_gkm"], int(first_year), str(r["fuel_type"]))
+        panels.append({
+            "fuel": str(r["fuel_type"]), "co2_gkm": _compact_float(r["co2_gkm"], 0),
+            "mpg": _compact_float(r["mpg_combined"], 0), "test_type": str(r["test_type"]),
+            "ved_band": ved.get("band"), "ved_annual": ved.get("annual"),
+            "ved_first_year": ved.get("first_year"), "ved_supplement": ved.get("supplement"),
+        })
+    return panels
+
+
+def test_vca_index_matches_linear_lookup():
+    import pandas as pd
+    from etl.join_publish import _vca_index
+    from etl.ved import load_ved_bands
+    from pathlib import Path
+    ved = load_ved_bands(str(Path(__file__).resolve().parents[1] / "data_intermediate" / "ved_bands.json"))
+    vca = pd.DataFrame({
+        # "Ford"/"FORD " and "Focus"/"focus" are two spellings of one normalised key
+        "norm_make": ["Ford", "FORD ", "ford", "vauxhall", "ford"],
+        "norm_model": ["Focus", "focus", "Fiesta", "Corsa", "Focus"],
+        "first_use_year": [2012, 2012, 2012, 2018, None],
+        "fuel_type": ["petrol", "diesel", "petrol", "petrol", "petrol"],
+        "co2_gkm": [125.0, 99.0, float("nan"), 120.0, 110.0],
+        "mpg_combined": [50.0, 70.0, 45.0, 55.0, 60.0],
+        "test_type": ["NEDC", "NEDC", "NEDC", "WLTP", "NEDC"],
+    })
+    index = _vca_index(vca, ved)
+    for key in [("ford", "focus", 2012), ("ford", "fiesta", 2012), ("vauxhall", "corsa", 2018),
+                ("ford", "focus", 2013), ("kia", "rio", 2012)]:
+        assert index.get(key, []) == _linear_vca_panel(vca, *key, ved)
+    assert [p["fuel"] for p in index[("ford", "focus", 2012)]] == ["petrol", "diesel"]
+    assert ("ford", "focus", 2013) not in index
+
+
+def _publish_env(tmp_path, monkeypatch, pub):
+    import pandas as pd
+    import etl.join_publish as jp
+    import etl.manifest as manifest
+    data = tmp_path / "int"
+    data.mkdir(parents=True, exist_ok=True)
+    rows = []
+    # "FORD"/"Ford" and "FOCUS"/"Focus" slug to the same ford/focus/<year>.json
+    for mk, md, base in (("FORD", "FOCUS", 0.5), ("Ford", "Focus", 0.9), ("VAUXHALL", "CORSA", 0.7)):
+        for y in (2010, 2011):
+            for age in (5, 6, 7):
+                rows.append({"make": mk, "model": md, "firstRegYear": y, "age_at_test": age,
+                             "pass_rate": base - age / 100, "p50": 1000 * age, "p75": 1200 * age, "p90": 1500 * age})
+    pd.DataFrame(rows).to_parquet(data / "mot_agg.parquet", index=False)
+    for name, val in (("MOT_AGG_PARQUET", data / "mot_agg.parquet"), ("RECALLS_PARQUET", data / "recalls.parquet"),
+                      ("VCA_PARQUET", data / "vca.parquet"), ("VED_JSON", data / "ved_bands.json"),
+                      ("INT", data), ("PUB", pub)):
+        monkeypatch.setattr(jp, name, val)
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", data / "manifests")
+    return jp, data
+
+
+def _tree(root):
+    return {p.relative_to(root).as_posix(): p.read_bytes() for p in sorted(root.rglob("*")) if p.is_file()}
+
+
+def test_parallel_publish_matches_serial(tmp_path, monkeypatch):
+    outs = []
+    for workers in (1, 3):
+        pub = tmp_path / f"pub{workers}"
+        jp, _ = _publish_env(tmp_path / f"w{workers}", monkeypatch, pub)
+        assert jp.build_and_publish(workers=workers, batch_size=1) == 4
+        outs.append(_tree(pub))
+    assert outs[0] == outs[1]
+    assert sorted(k for k in outs[0] if k.endswith(".json")) == [
+        "ford/focus/2010.json", "ford/focus/2011.json", "vauxhall/corsa/2010.json", "vauxhall/corsa/2011.json"]
+
+
+def test_republish_rewrites_only_changed_and_deletes_stale(tmp_path, monkeypatch):
+    import hashlib
+    import pandas as pd
+    pub = tmp_path / "pub"
+    jp, data = _publish_env(tmp_path, monkeypatch, pub)
+    changed_txt = data / "publish_changed.txt"
+    jp.build_and_publish(workers=1)
+    assert len(changed_txt.read_text().split()) == 4
+    mtimes = {p: p.stat().st_mtime_ns for p in pub.rglob("*.json")}
+
+    # Unchanged inputs: nothing rewritten, nothing listed, manifest agrees with disk
+    jp.build_and_publish(workers=1)
+    assert changed_txt.read_text() == ""
+    assert {p: p.stat().st_mtime_ns for p in pub.rglob("*.json")} == mtimes
+    manifest = jp.load_manifest("publish")
+    assert {rel: e["sha1"] for rel, e in manifest.items()} == {
+        p.relative_to(pub).as_posix(): hashlib.sha1(p.read_bytes()).hexdigest() for p in pub.rglob("*.json")}
+
+    # One cohort changes and another disappears
+    mot = pd.read_parquet(data / "mot_agg.parquet")
+    mot.loc[(mot["make"] == "VAUXHALL") & (mot["firstRegYear"] == 2010), "pass_rate"] = 0.1
+    mot = mot[~((mot["make"] == "VAUXHALL") & (mot["firstRegYear"] == 2011))]
+    mot.to_parquet(data / "mot_agg.parquet", index=False)
+    jp.build_and_publish(workers=1)
+    assert changed_txt.read_text().split() == ["vauxhall/corsa/2010.json", "vauxhall/corsa/2011.json"]
+    assert not (pub / "vauxhall" / "corsa" / "2011.json").exists()
+    assert (pub / "ford" / "focus" / "2010.json").stat().st_mtime_ns == mtimes[pub / "ford" / "focus" / "2010.json"]
+
+
+def test_publish_rewrites_file_truncated_behind_manifest(tmp_path, monkeypatch):
+    pub = tmp_path / "pub"
+    jp, data = _publish_env(tmp_path, monkeypatch, pub)
+    jp.build_and_publish(workers=1)
+    doc = pub / "ford" / "focus" / "2010.json"
+    good = doc.read_bytes()
+    doc.write_bytes(good[:10])
+    jp.build_and_publish(workers=1)
+    assert doc.read_bytes() == good
+    assert (data / "publish_changed.txt").read_text().split() == ["ford/focus/2010.json"]
+
+
+def test_changed_document_drops_siblings_no_longer_generated(tmp_path, monkeypatch):
+    import gzip
+    import pandas as pd
+    pub = tmp_path / "pub"
+    jp, data = _publish_env(tmp_path, monkeypatch, pub)
+    monkeypatch.setattr(jp, "PRECOMPRESS", ("gz",))
+    jp.build_and_publish(workers=1)
+    doc = pub / "vauxhall" / "corsa" / "2010.json"
+    assert gzip.decompress((pub / "vauxhall" / "corsa" / "2010.json.gz").read_bytes()) == doc.read_bytes()
+
+    # Precompression switched off, then the document changes: the old .gz must go
+    monkeypatch.setattr(jp, "PRECOMPRESS", ())
+    mot = pd.read_parquet(data / "mot_agg.parquet")
+    mot.loc[mot["make"] == "VAUXHALL", "pass_rate"] = 0.2
+    mot.to_parquet(data / "mot_agg.parquet", index=False)
+    jp.build_and_publish(workers=1)
+    assert not (pub / "vauxhall" / "corsa" / "2010.json.gz").exists()
+    assert (pub / "ford" / "focus" / "2010.json.gz").exists()  # unchanged, still current
+
+
+def test_sharded_run_publishes_files_instead_of_packs(tmp_path, monkeypatch):
+    pub = tmp_path / "pub"
+    jp, _ = _publish_env(tmp_path, monkeypatch, pub)
+    monkeypatch.setattr(jp, "PUBLISH_FORMAT", "pack")
+    monkeypatch.setenv("ETL_SHARDS", "2")
+    published = []
+    for shard in ("0", "1"):
+        monkeypatch.setenv("ETL_SHARD", shard)
+        published.append(jp.build_and_publish(workers=1))
+    assert sum(published) == 4
+    assert not (pub / jp.PACK_DIR).exists()
+    assert sorted(p.relative_to(pub).as_posix() for p in pub.rglob("*.json")) == [
+        "ford/focus/2010.json", "ford/focus/2011.json", "vauxhall/corsa/2010.json", "vauxhall/corsa/2011.json"]
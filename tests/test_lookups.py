@@ -0,0 +1,23 @@
+import etl.lookups as lk
+
+
+def test_lookup_cache_is_reused_until_a_source_changes(tmp_path, monkeypatch):
+    look = tmp_path / "lookups"
+    look.mkdir()
+    (look / "fuel_types.csv").write_text("fuel_type_code,fuel_type\nPE,Petrol\nDI,Diesel\nLP,LPG\n", encoding="utf-8")
+    (look / "rfr_items.csv").write_text("rfr_id,section\n101,1.1.2\n202,4.3\n303,none\n", encoding="utf-8")
+    cache = tmp_path / "int" / "lookups_cache.json"
+
+    maps = lk.cached_lookups(look, cache)
+    assert maps["fuel_codes"]["LP"] == "LPG"
+    assert maps["rfr_bucket"] == {"101": "brakes", "202": "lights", "303": "other"}
+    assert cache.exists()
+
+    def boom(_):
+        raise AssertionError("lookups re-parsed")
+    monkeypatch.setattr(lk, "_build_maps", boom)
+    assert lk.cached_lookups(look, cache) == maps
+
+    monkeypatch.undo()
+    (look / "rfr_items.csv").write_text("rfr_id,section\n101,8.1\n", encoding="utf-8")
+    assert lk.cached_lookups(look, cache)["rfr_bucket"] == {"101": "emissions"}
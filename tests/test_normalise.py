@@ -0,0 +1,22 @@
+import pandas as pd
+
+from etl.resolver import _norm, norm_series, slug_series, factorize_map
+
+
+def test_norm_series_matches_scalar_norm():
+    vals = ["Ford", "FIESTA Hatchback", "Golf 2.0 TDI auto", "Škoda  Octavia/Estate", None, float("nan"), "Ford"]
+    s = pd.Series(vals * 50, index=range(1000, 1000 + len(vals) * 50))
+    out = norm_series(s)
+    assert out.index.equals(s.index)
+    assert out.tolist() == [_norm(v) for v in s]
+    assert slug_series(pd.Series(["skoda octavia", ""])).tolist() == ["skoda-octavia", ""]
+
+
+def test_factorize_map_calls_once_per_unique():
+    calls = []
+    def fn(v):
+        calls.append(v)
+        return str(v).upper()
+    out = factorize_map(pd.Series(["a", "b", "a", None, "b"]), fn)
+    assert out.tolist() == ["A", "B", "A", "NONE", "B"]
+    assert sorted(map(str, calls)) == ["None", "a", "b"]
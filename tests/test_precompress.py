@@ -0,0 +1,33 @@
+import gzip
+
+from etl.precompress import precompress_files, needs_siblings, remove_siblings
+
+
+def test_gz_siblings_are_stable_and_removable(tmp_path):
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"{i}.json"
+        p.write_bytes(b'{"n":%d,"pad":"%s"}' % (i, b"x" * 500))
+        paths.append(p)
+    assert all(needs_siblings(p, ("gz",)) for p in paths)
+    assert precompress_files(paths, ("gz",), workers=2) == 3
+    first = (tmp_path / "0.json.gz").read_bytes()
+    assert gzip.decompress(first) == paths[0].read_bytes()
+    assert not needs_siblings(paths[0], ("gz",))
+
+    # mtime=0 keeps the compressed bytes identical across runs
+    precompress_files(paths[:1], ("gz",), workers=1)
+    assert (tmp_path / "0.json.gz").read_bytes() == first
+
+    remove_siblings(paths[0])
+    assert needs_siblings(paths[0], ("gz",))
+
+
+def test_remove_siblings_keeps_requested_formats(tmp_path):
+    p = tmp_path / "doc.json"
+    p.write_bytes(b"{}")
+    for fmt in ("gz", "br"):
+        (tmp_path / f"doc.json.{fmt}").write_bytes(b"old")
+    remove_siblings(p, keep=("gz",))
+    assert (tmp_path / "doc.json.gz").exists()
+    assert not (tmp_path / "doc.json.br").exists()
@@ -0,0 +1,91 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+import requests
+
+import etl.manifest as manifest
+import etl.recalls as recalls
+
+CSV = b"""Launch Date,Make,Recalls Model Information,Concern
+01/02/2020,FORD ,FOCUS   ST,Brakes
+15/06/2021,ford,FIESTA,Airbag
+"""
+ETAG = '"v1"'
+LAST_MODIFIED = "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        type(self).requests_seen.append(dict(self.headers))
+        if not self.path.endswith("/RecallsFile.csv"):
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(CSV)))
+        self.end_headers()
+        self.wfile.write(CSV)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.requests_seen = []
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}/RecallsFile.csv"
+    srv.shutdown()
+
+
+def test_load_recalls_revalidates_and_reuses_parquet(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(recalls, "INT", tmp_path)
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", tmp_path / "manifests")
+    out = tmp_path / "recalls.parquet"
+
+    first = recalls.load_recalls(server, out)
+    assert first["make"].tolist() == ["Ford", "Ford"]
+    assert first["model"].tolist() == ["FOCUS ST", "FIESTA"]
+    assert first["year"].tolist() == [2020, 2021]
+    assert "If-None-Match" not in _Handler.requests_seen[0]
+
+    before = out.stat().st_mtime_ns
+    second = recalls.load_recalls(server, out)
+    assert _Handler.requests_seen[1]["If-None-Match"] == ETAG
+    assert _Handler.requests_seen[1]["If-Modified-Since"] == LAST_MODIFIED
+    assert out.stat().st_mtime_ns == before
+    pd.testing.assert_frame_equal(first, second)
+
+    # Without the Parquet copy a 304 would leave nothing to reuse: ask unconditionally
+    out.unlink()
+    recalls.load_recalls(server, out)
+    assert "If-None-Match" not in _Handler.requests_seen[2]
+    assert out.exists()
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_load_recalls_falls_back_to_cache_when_fetch_fails(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(recalls, "INT", tmp_path)
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", tmp_path / "manifests")
+    out = tmp_path / "recalls.parquet"
+    first = recalls.load_recalls(server, out)
+
+    # Server error, then unreachable host: both reuse the parsed copy
+    pd.testing.assert_frame_equal(recalls.load_recalls(server.replace("RecallsFile", "missing"), out), first)
+    pd.testing.assert_frame_equal(recalls.load_recalls("http://127.0.0.1:9/RecallsFile.csv", out), first)
+
+    out.unlink()
+    with pytest.raises(requests.ConnectionError):
+        recalls.load_recalls("http://127.0.0.1:9/RecallsFile.csv", out)
@@ -0,0 +1,41 @@
+import zipfile
+import zlib
+from etl.sources import CsvSource, find_csv_sources
+
+def test_find_csv_sources_lists_files_and_zip_members(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "plain.csv").write_text("a\n1\n")
+    with zipfile.ZipFile(tmp_path / "data.zip", "w") as z:
+        z.writestr("x.csv", "a\n2\n")
+        z.writestr("readme.txt", "ignored")
+        z.writestr("__MACOSX/._x.csv", "junk")
+
+    srcs = find_csv_sources(tmp_path)
+    assert [s.key(tmp_path) for s in srcs] == ["sub/plain.csv", "data.zip!x.csv"]
+    with srcs[1].open() as f:
+        assert f.read() == b"a\n2\n"
+
+def test_zip_member_fingerprint_comes_from_the_directory(tmp_path):
+    with zipfile.ZipFile(tmp_path / "data.zip", "w") as z:
+        z.writestr("x.csv", "a\n2\n")
+    fp = CsvSource(tmp_path / "data.zip", "x.csv").fingerprint()
+    assert fp == {"size": 4, "crc32": "%08x" % zlib.crc32(b"a\n2\n")}
+
+def test_extracted_copies_of_zip_members_are_skipped(tmp_path):
+    with zipfile.ZipFile(tmp_path / "results.zip", "w") as z:
+        z.writestr("2024/results.csv", "a\n1\n")
+    (tmp_path / "2024").mkdir()
+    (tmp_path / "2024" / "results.csv").write_text("a\n1\n")  # left by an old unzip
+    (tmp_path / "other.csv").write_text("a\n2\n")
+    assert [s.key(tmp_path) for s in find_csv_sources(tmp_path)] == ["other.csv", "results.zip!2024/results.csv"]
+
+def test_loose_csv_differing_from_zip_member_is_kept(tmp_path):
+    with zipfile.ZipFile(tmp_path / "results.zip", "w") as z:
+        z.writestr("2024/results.csv", "a\n1\n")
+        z.writestr("results.csv", "a\n2\n")
+    (tmp_path / "2024").mkdir()
+    (tmp_path / "2024" / "results.csv").write_text("a\n9\n")  # same size, different rows
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "results.csv").write_text("a\n2\n")  # same content, not where the zip extracts
+    assert [s.key(tmp_path) for s in find_csv_sources(tmp_path)] == [
+        "2024/results.csv", "sub/results.csv", "results.zip!2024/results.csv", "results.zip!results.csv"]
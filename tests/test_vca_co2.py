@@ -0,0 +1,24 @@
+import pandas as pd
+import etl.vca_co2 as vca
+
+def test_build_vca_parquet_expands_year_ranges_and_collapses(tmp_path, monkeypatch):
+    monkeypatch.setattr(vca, "VCA_PARQUET", tmp_path / "vca.parquet")
+    pd.DataFrame({
+        "Manufacturer": ["Zzmake", "Zzmake", "Zzmake", "Zzmake"],
+        "Model": ["Alpha", "Alpha", "Alpha", "Beta"],
+        "YearFrom": [2010, 2011, 2011, 2015],
+        "YearTo": [2012, 2011, None, 2014],  # Beta's range is empty
+        "Fuel Type": ["Petrol", " petrol ", "PETROL", "Diesel"],
+        "CO2 (g/km)": ["120", "140", "abc", "99"],
+        "Combined MPG": [50, 40, 30, 60],
+        "Test Type": ["nedc", "WLTP ", "wltp", "NEDC"],
+    }).to_csv(tmp_path / "vca.csv", index=False)
+
+    out = vca.build_vca_parquet(tmp_path / "vca.csv")
+
+    assert out["first_use_year"].tolist() == [2010, 2011, 2012]
+    assert out["fuel_type"].unique().tolist() == ["petrol"]
+    assert out["co2_gkm"].tolist() == [120.0, 130.0, 120.0]
+    assert out["mpg_combined"].tolist() == [50.0, 40.0, 50.0]
+    assert out["test_type"].tolist() == ["NEDC", "WLTP", "NEDC"]
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "vca.parquet"), out)
@@ -0,0 +1,38 @@
+from pathlib import Path
+import numpy as np
+from etl.ved import load_ved_bands, ved_for_vehicle, ved_for_vehicles
+
+CFG = {"eras": {
+    "2001to2017": {"bands": [
+        {"band": "B", "co2_lo": 101, "co2_hi": 110, "annual": 20},
+        {"band": "A", "co2_lo": 0, "co2_hi": 100, "annual": 20},
+        {"band": "M", "co2_lo": 256, "co2_hi": 999, "annual": 760},
+    ]},
+    "post2017": {
+        "first_year": [{"co2_lo": 0, "co2_hi": 0, "rate": 10}, {"co2_lo": 1, "co2_hi": 150, "rate": 540}],
+        "standard_rate": 195,
+        "expensive_car_supplement": {"annual": 425},
+    },
+}}
+
+def test_ved_for_vehicles_matches_scalar_lookup():
+    co2 = np.array([95, 100.5, 105, 300, 1200, 0, np.nan, 120, 151])
+    years = np.array([2010, 2010, 2016, 2005, 2005, 2010, 2018, 2020, 2019])
+    out = ved_for_vehicles(CFG, co2, years)
+    assert out["band"].tolist() == ["A", None, "B", "M", None, None, None, None, None]
+    assert out["annual"].tolist() == [20, None, 20, 760, None, None, None, 195, 195]
+    assert out["first_year"].tolist() == [None] * 7 + [540, None]
+    assert out["supplement"].iloc[7] == {"expensive_car": {"annual": 425}}
+    for i, r in enumerate(out.to_dict("records")):
+        assert ved_for_vehicle(CFG, co2[i], int(years[i]), "petrol") == r
+
+def test_overlapping_bands_keep_first_match_order():
+    cfg = {"eras": {"2001to2017": {"bands": [
+        {"band": "X", "co2_lo": 50, "co2_hi": 150, "annual": 1},
+        {"band": "A", "co2_lo": 0, "co2_hi": 100, "annual": 20},
+    ]}}}
+    assert ved_for_vehicles(cfg, [40, 60, 120], [2010] * 3)["band"].tolist() == ["A", "X", "X"]
+
+def test_shipped_table_loads():
+    cfg = load_ved_bands(str(Path(__file__).resolve().parents[1] / "data_intermediate" / "ved_bands.json"))
+    assert ved_for_vehicle(cfg, 120, 2012, "petrol")["band"] == "C"